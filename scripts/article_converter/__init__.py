@@ -0,0 +1,23 @@
+"""Convert Japan travel articles with Azure OpenAI, as HTML pages or WordPress posts.
+
+    from article_converter import ConversionOptions, convert
+
+    convert("wordpress", "articles.xlsx", "posts.xlsx", ConversionOptions(resume=True))
+
+pandas, openai and tkinter are only imported when a conversion actually runs.
+"""
+
+__all__ = ["ConversionOptions", "InputFileError", "convert", "export", "get_profile"]
+
+
+def __getattr__(name):
+    if name in ("ConversionOptions", "convert", "export"):
+        from . import converter
+        return getattr(converter, name)
+    if name == "InputFileError":
+        from .spreadsheet import InputFileError
+        return InputFileError
+    if name == "get_profile":
+        from .profiles import get_profile
+        return get_profile
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,211 @@
+"""Azure OpenAI Batch API mode: submit, poll and merge a whole sheet at once."""
+import json
+import os
+import time
+
+from .cache import request_key
+from .metrics import RequestRecord
+
+# Azure OpenAI limits for a single batch input file
+MAX_REQUESTS_PER_BATCH = 100000
+MAX_BATCH_FILE_BYTES = 190 * 1024 * 1024
+
+FINISHED_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+class BatchRequestError(Exception):
+    """A row that the Batch API could not complete."""
+
+
+def default_state_path(input_file, profile):
+    """File remembering submitted batch ids, e.g. articles.xlsx.html.batch.json"""
+    return f"{input_file}.{profile}.batch.json"
+
+
+def custom_id(key):
+    """custom_id for a job key: a row index, or an (index, section) tuple."""
+    if isinstance(key, tuple):
+        return "row-" + "-".join(str(part) for part in key)
+    return f"row-{key}"
+
+
+def key_from_custom_id(value):
+    parts = tuple(int(part) for part in value.split("-")[1:])
+    return parts if len(parts) > 1 else parts[0]
+
+
+def batch_body(model, messages, request_params):
+    # Streaming makes no sense in a batch and None values are rejected by validation
+    body = {key: value for key, value in request_params.items() if value is not None and key != "stream"}
+    body["model"] = model
+    body["messages"] = messages
+    return body
+
+
+def write_batch_files(jobs, model, request_params, directory, prefix):
+    """Serialize (key, messages) jobs into one or more Batch API JSONL files.
+
+    A new file is started whenever the Azure per-file request or size limit
+    would be exceeded. Returns the list of paths written.
+    """
+    paths = []
+    handle = None
+    requests = 0
+    size = 0
+    for key, messages in jobs:
+        line = json.dumps({
+            "custom_id": custom_id(key),
+            "method": "POST",
+            "url": "/chat/completions",
+            "body": batch_body(model, messages, request_params),
+        }, ensure_ascii=False) + "\n"
+        line_bytes = len(line.encode("utf-8"))
+        if handle is None or requests >= MAX_REQUESTS_PER_BATCH or size + line_bytes > MAX_BATCH_FILE_BYTES:
+            if handle is not None:
+                handle.close()
+            path = os.path.join(directory, f"{prefix}.batch-input-{len(paths) + 1}.jsonl")
+            handle = open(path, "w", encoding="utf-8")
+            paths.append(path)
+            requests = 0
+            size = 0
+        handle.write(line)
+        requests += 1
+        size += line_bytes
+    if handle is not None:
+        handle.close()
+    return paths
+
+
+def submit_batch(client, path, completion_window="24h"):
+    with open(path, "rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/chat/completions",
+        completion_window=completion_window,
+    )
+    print(f"Submitted batch {batch.id} ({os.path.basename(path)})")
+    return batch.id
+
+
+def wait_for_batch(client, batch_id, poll_interval=60):
+    """Poll a batch until it reaches a final status and return it."""
+    last_status = None
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        progress = f" ({counts.completed}/{counts.total} done, {counts.failed} failed)" if counts else ""
+        if batch.status != last_status or batch.status == "in_progress":
+            print(f"Batch {batch_id}: {batch.status}{progress}")
+            last_status = batch.status
+        if batch.status in FINISHED_STATUSES:
+            return batch
+        time.sleep(poll_interval)
+
+
+def _read_file_lines(client, file_id):
+    if not file_id:
+        return []
+    content = client.files.content(file_id)
+    return [json.loads(line) for line in content.text.splitlines() if line.strip()]
+
+
+def download_results(client, batch):
+    """Yield (key, completion, error) for every job found in the batch output and error files."""
+    from openai.types.chat import ChatCompletion
+
+    for record in _read_file_lines(client, batch.output_file_id) + _read_file_lines(client, batch.error_file_id):
+        key = key_from_custom_id(record["custom_id"])
+        response = record.get("response") or {}
+        if record.get("error"):
+            yield key, None, BatchRequestError(record["error"].get("message", record["error"]))
+        elif response.get("status_code") == 200:
+            yield key, ChatCompletion.model_validate(response["body"]), None
+        else:
+            error = (response.get("body") or {}).get("error") or {}
+            yield key, None, BatchRequestError(
+                f"status {response.get('status_code')}: {error.get('message', 'unknown error')}"
+            )
+
+
+def _record_result(metrics, model, key, completion=None, error=None):
+    if metrics is None:
+        return
+    record = RequestRecord.for_key(key, "batch", model)
+    if error is not None:
+        record.status = "error"
+        record.error = str(error)
+    else:
+        record.read_completion(completion)
+    metrics.record(record)
+
+
+def run_batch(client, model, request_params, jobs, on_success, on_error, state_path,
+              cache=None, poll_interval=60, metrics=None):
+    """Convert (key, messages) jobs through the Batch API instead of one request per row.
+
+    Rows already in the completion cache are answered locally. The rest are
+    written to JSONL input files and submitted, and the batch ids are saved in
+    `state_path`. The batches are polled until they finish, then their output
+    is merged back by custom_id through the same `on_success(key,
+    completion)` and `on_error(key, exception)` callbacks ChatRunner uses.
+    If the script is stopped while waiting, the next run with the same state
+    file picks the submitted batches up again instead of paying for them twice.
+    Each result is passed to `metrics` with its token usage; batch requests
+    have no latency of their own.
+    """
+    jobs = list(jobs)
+    messages_by_key = dict(jobs)
+
+    pending = []
+    for key, messages in jobs:
+        cached = cache.get(request_key(model, messages, request_params)) if cache is not None else None
+        if cached is not None:
+            _record_result(metrics, model, key, cached)
+            on_success(key, cached)
+        else:
+            pending.append((key, messages))
+
+    if os.path.exists(state_path):
+        with open(state_path, encoding="utf-8") as f:
+            batch_ids = json.load(f)["batch_ids"]
+        print(f"Reattaching to submitted batches: {', '.join(batch_ids)}")
+    else:
+        if not pending:
+            return
+        directory = os.path.dirname(os.path.abspath(state_path))
+        prefix = os.path.basename(state_path)[:-len(".batch.json")]
+        paths = write_batch_files(pending, model, request_params, directory, prefix)
+        batch_ids = []
+        for path in paths:
+            batch_ids.append(submit_batch(client, path))
+            # Saved after every submission so no paid batch is ever forgotten
+            with open(state_path, "w", encoding="utf-8") as f:
+                json.dump({"batch_ids": batch_ids}, f)
+        for path in paths:
+            os.remove(path)
+
+    merged = set()
+    for batch_id in batch_ids:
+        batch = wait_for_batch(client, batch_id, poll_interval)
+        if batch.status != "completed":
+            print(f"Batch {batch_id} ended with status '{batch.status}', merging the rows it finished")
+        for key, completion, error in download_results(client, batch):
+            if key not in messages_by_key:
+                continue
+            merged.add(key)
+            _record_result(metrics, model, key, completion, error)
+            if error is not None:
+                on_error(key, error)
+                continue
+            accepted = on_success(key, completion)
+            if cache is not None and accepted is not False:
+                cache.put(request_key(model, messages_by_key[key], request_params), completion)
+
+    for key, _ in pending:
+        if key not in merged:
+            error = BatchRequestError("no result in the batch output")
+            _record_result(metrics, model, key, error=error)
+            on_error(key, error)
+
+    os.remove(state_path)
@@ -0,0 +1,276 @@
+"""Offline benchmarks: convert synthetic sheets against the stub server and measure them.
+
+    python -m article_converter.benchmark --rows 1000 10000 50000 --output bench.json
+    python -m article_converter.benchmark --rows 1000 --baseline bench.json
+
+For every sheet (size x format) and profile, a child process converts the
+sheet against a stub server running in this process, so no quota is spent.
+Each case reports rows/s, peak RSS of the child, the time to import the
+dependencies, to read the whole sheet (ingest) and to write the result
+(save), plus the request latencies. The startup time of the CLI is measured
+once. With --baseline, the numbers are compared with an earlier --output file
+and the exit status is 1 if any of them got worse by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from .profiles import PROFILE_NAMES
+from .sample_sheets import FORMATS, write_sheet
+
+# Numbers compared with the baseline, and whether higher is better
+COMPARED = {
+    "rows_per_second": True,
+    "peak_rss_mb": False,
+    "ingest_seconds": False,
+    "save_seconds": False,
+}
+# Timings this close are noise, whatever the relative change
+MIN_SECONDS_CHANGE = 0.1
+
+
+def _sheet_path(workdir, rows, sheet_format, seed):
+    extension = "xlsx" if sheet_format == "xlsx" else "csv"
+    return os.path.join(workdir, f"articles-{rows}-{sheet_format}-seed{seed}.{extension}")
+
+
+def prepare_sheets(workdir, row_counts, formats, seed=0):
+    """Write the synthetic sheets that don't exist yet; returns {(rows, format): path}."""
+    os.makedirs(workdir, exist_ok=True)
+    sheets = {}
+    for rows in row_counts:
+        for sheet_format in formats:
+            path = _sheet_path(workdir, rows, sheet_format, seed)
+            if not os.path.exists(path):
+                print(f"Writing {rows} synthetic articles to {path}...")
+                write_sheet(path, rows, sheet_format, seed)
+            sheets[rows, sheet_format] = path
+    return sheets
+
+
+def start_stub_server(stub_args):
+    """Run the stub server in a background thread on a free port; returns the server."""
+    from .stub_server import build_parser, make_server
+
+    options = build_parser().parse_args(["--port", "0", "--quiet"] + stub_args)
+    server = make_server(options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def measure_startup(repeat=3):
+    """Best wall time of `python -m article_converter --help`, which imports no heavy dependency."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "article_converter", "--help"], check=True,
+                       stdout=subprocess.DEVNULL, env=_child_env())
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _child_env(endpoint=None):
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+    if endpoint:
+        env["ENDPOINT_URL"] = endpoint
+        env["AZURE_OPENAI_API_KEY"] = "benchmark"
+    return env
+
+
+def run_case(case, endpoint, workdir):
+    """Convert one sheet in a child process; returns its measurements."""
+    name = f"{case['profile']}-{case['rows']}-{case['format']}"
+    result_path = os.path.join(workdir, f"{name}.result.json")
+    log_path = os.path.join(workdir, f"{name}.log")
+    spec = dict(case, result_path=result_path, workdir=workdir)
+    with open(log_path, "w", encoding="utf-8") as log:
+        process = subprocess.run([sys.executable, "-m", "article_converter.benchmark", "--child", json.dumps(spec)],
+                                 stdout=log, stderr=subprocess.STDOUT, env=_child_env(endpoint))
+    if process.returncode != 0:
+        raise RuntimeError(f"Benchmark case {name} failed, see {log_path}")
+    with open(result_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _child(spec):
+    """Runs in the child process: import, ingest, convert and report."""
+    start = time.perf_counter()
+    import openai  # noqa: F401
+    import openpyxl  # noqa: F401
+    import pandas  # noqa: F401
+
+    from .converter import ConversionOptions, convert
+    from .spreadsheet import read_chunks
+    import_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rows = sum(len(chunk) for chunk in read_chunks(spec["input"], spec["chunk_size"]))
+    ingest_seconds = time.perf_counter() - start
+
+    extension = "xlsx" if spec["output_format"] == "xlsx" else "csv"
+    with tempfile.TemporaryDirectory(dir=spec["workdir"]) as directory:
+        options = ConversionOptions(
+            use_cache=False,
+            checkpoint_path=os.path.join(directory, "checkpoint.sqlite"),
+            max_workers=spec["concurrency"],
+            chunk_size=spec["chunk_size"],
+        )
+        start = time.perf_counter()
+        summary = convert(spec["profile"], spec["input"], os.path.join(directory, f"output.{extension}"), options)
+        convert_seconds = time.perf_counter() - start
+
+    metrics = summary["metrics"]
+    result = {
+        "profile": spec["profile"],
+        "rows": spec["rows"],
+        "format": spec["format"],
+        "rows_read": rows,
+        "converted": summary["converted"],
+        "failed": summary["failed"],
+        "import_seconds": import_seconds,
+        "ingest_seconds": ingest_seconds,
+        "convert_seconds": convert_seconds,
+        "rows_per_second": rows / convert_seconds if convert_seconds else 0.0,
+        "save_seconds": metrics["phases"].get("write", 0.0),
+        "requests_seconds": metrics["phases"].get("requests", 0.0),
+        "latency_p50": metrics["latency_p50"],
+        "latency_p95": metrics["latency_p95"],
+        "retries": metrics["retries"],
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    with open(spec["result_path"], "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def compare(results, baseline, tolerance):
+    """Print the change of every compared number; returns the regressions beyond `tolerance`."""
+    previous = {(case["profile"], case["rows"], case["format"]): case for case in baseline.get("cases", [])}
+    regressions = []
+    print(f"\nCompared with the baseline ({tolerance:.0%} tolerance):")
+    for case in results["cases"]:
+        key = (case["profile"], case["rows"], case["format"])
+        if key not in previous:
+            continue
+        changes = []
+        for name, higher_is_better in COMPARED.items():
+            old, new = previous[key].get(name), case.get(name)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            worse = -change if higher_is_better else change
+            noise = name.endswith("_seconds") and abs(new - old) < MIN_SECONDS_CHANGE
+            marker = " REGRESSION" if worse > tolerance and not noise else ""
+            changes.append(f"{name} {change:+.0%}{marker}")
+            if marker:
+                regressions.append((key, name, old, new))
+        print(f"  {key[0]:9} {key[1]:>6} {key[2]:12} " + ", ".join(changes))
+    return regressions
+
+
+def print_table(results):
+    print(f"\nCLI startup: {results['startup_seconds']:.2f}s")
+    header = f"{'profile':9} {'rows':>6} {'format':12} {'rows/s':>8} {'peak MB':>8} {'import':>7} " \
+             f"{'ingest':>7} {'save':>6} {'p50':>6} {'p95':>6}"
+    print(header)
+    print("-" * len(header))
+    for case in results["cases"]:
+        rss = f"{case['peak_rss_mb']:.0f}" if case["peak_rss_mb"] is not None else "n/a"
+        p50 = f"{case['latency_p50']:.2f}" if case["latency_p50"] is not None else "n/a"
+        p95 = f"{case['latency_p95']:.2f}" if case["latency_p95"] is not None else "n/a"
+        print(f"{case['profile']:9} {case['rows']:>6} {case['format']:12} {case['rows_per_second']:>8.1f} "
+              f"{rss:>8} {case['import_seconds']:>6.2f}s {case['ingest_seconds']:>6.2f}s "
+              f"{case['save_seconds']:>5.2f}s {p50:>6} {p95:>6}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m article_converter.benchmark",
+        description="Convert synthetic sheets against a local stub server and measure throughput and memory.",
+    )
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000], help="sheet sizes (default: 1000)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=["xlsx", "csv", "csv-escaped"],
+                        help="sheet formats (default: xlsx csv csv-escaped)")
+    parser.add_argument("--profiles", nargs="+", choices=PROFILE_NAMES, default=list(PROFILE_NAMES))
+    parser.add_argument("--output-format", choices=("csv", "xlsx"), default="csv",
+                        help="format of the converted sheet (default: csv)")
+    parser.add_argument("--workdir", default="benchmark-data",
+                        help="where sheets, logs and results are kept (default: benchmark-data)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic sheets and the stub server")
+    parser.add_argument("--concurrency", type=int, default=16, help="parallel requests (default: 16)")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--stub-args", default="--min-latency 0.01 --max-latency 0.05 --rate-limit-probability 0",
+                        help="options for the stub server, e.g. \"--latency-distribution lognormal --tpm 450000 "
+                             "--error-probability 0.01\" (default: %(default)s)")
+    parser.add_argument("--output", help="save the results as JSON")
+    parser.add_argument("--baseline", help="compare with the results saved by an earlier --output")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="relative change counted as a regression (default: 0.1)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.child:
+        _child(json.loads(args.child))
+        return 0
+
+    sheets = prepare_sheets(args.workdir, args.rows, args.formats, args.seed)
+    server = start_stub_server(args.stub_args.split() + ["--seed", str(args.seed)])
+    endpoint = f"http://127.0.0.1:{server.server_port}/"
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "stub_args": args.stub_args,
+        },
+        "startup_seconds": measure_startup(),
+        "cases": [],
+    }
+    try:
+        for (rows, sheet_format), path in sheets.items():
+            for profile in args.profiles:
+                print(f"Converting {rows} rows ({sheet_format}) with profile {profile}...")
+                results["cases"].append(run_case({
+                    "profile": profile, "rows": rows, "format": sheet_format, "input": path,
+                    "output_format": args.output_format, "concurrency": args.concurrency,
+                    "chunk_size": args.chunk_size,
+                }, endpoint, args.workdir))
+    finally:
+        server.shutdown()
+
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""On-disk cache of completions, keyed by the full request."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "article_converter", "completion_cache.sqlite")
+
+
+def request_key(model, messages, request_params):
+    """Hash of everything that decides the answer: deployment, full prompt and sampling params.
+
+    The messages include the system message and the few-shot examples, so
+    editing the prompt in either script produces new keys and old answers
+    are never reused for it.
+    """
+    # Streaming changes how the answer arrives, not the answer
+    params = {key: value for key, value in request_params.items() if key != "stream"}
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def prompt_fingerprint(chat_prompt, request_params):
+    """Hash of the shared part of every request (prompt and sampling params).
+
+    The deployment is left out: it is part of every entry's key already, and
+    keeping it out lets batch and interactive runs on different deployments
+    share the cache instead of wiping each other's entries.
+    """
+    return request_key(None, chat_prompt, request_params)
+
+
+class _Message:
+    def __init__(self, content):
+        self.role = "assistant"
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content, finish_reason):
+        self.index = 0
+        self.message = _Message(content)
+        self.finish_reason = finish_reason
+
+
+class CachedCompletion:
+    """Minimal stand-in for a ChatCompletion served from the cache."""
+
+    cached = True
+    usage = None
+
+    def __init__(self, content, finish_reason):
+        self.choices = [_Choice(content, finish_reason)]
+
+
+class CompletionCache:
+    """On-disk cache of chat completions, shared by both scripts.
+
+    Entries are grouped by profile ("html", "wordpress") and tagged with the
+    fingerprint of the prompt that produced them. Opening the cache with a new
+    fingerprint drops that profile's old entries. Entries older than
+    `max_age_days` are evicted, and the least recently used ones go once the
+    cache grows past `max_bytes`.
+    """
+
+    def __init__(self, path, profile, fingerprint, max_bytes=500 * 1024 * 1024, max_age_days=90):
+        self.path = path
+        self.profile = profile
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                profile TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                content TEXT NOT NULL,
+                finish_reason TEXT,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+        self._connection.execute(
+            "DELETE FROM completions WHERE profile = ? AND fingerprint != ?",
+            (profile, fingerprint),
+        )
+        self._connection.commit()
+        self.evict()
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, finish_reason FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute(
+                "UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._connection.commit()
+        return CachedCompletion(*row)
+
+    def put(self, key, completion):
+        choice = completion.choices[0]
+        content = choice.message.content
+        # An answer cut off at max_tokens (finish_reason "length") or filtered
+        # must be asked for again, not replayed on every rerun
+        if content is None or choice.finish_reason != "stop":
+            return
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO completions "
+                "(key, profile, fingerprint, content, finish_reason, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, self.profile, self.fingerprint, content, choice.finish_reason,
+                 len(content.encode("utf-8")), now, now),
+            )
+            self._connection.commit()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones until under max_bytes."""
+        with self._lock:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                self._connection.execute("DELETE FROM completions WHERE created_at < ?", (cutoff,))
+            if self.max_bytes:
+                total = self._connection.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM completions"
+                ).fetchone()[0]
+                if total > self.max_bytes:
+                    rows = self._connection.execute(
+                        "SELECT key, size FROM completions ORDER BY last_used"
+                    ).fetchall()
+                    stale = []
+                    for key, size in rows:
+                        if total <= self.max_bytes:
+                            break
+                        stale.append((key,))
+                        total -= size
+                    self._connection.executemany("DELETE FROM completions WHERE key = ?", stale)
+            self._connection.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions WHERE profile = ?",
+                (self.profile,),
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        self.evict()
+        self._connection.close()
+
+
+def open_cache(profile, chat_prompt, request_params, path=None):
+    """Open the completion cache configured by COMPLETION_CACHE, CACHE_MAX_MB and CACHE_MAX_AGE_DAYS."""
+    path = path or os.getenv("COMPLETION_CACHE", DEFAULT_CACHE_PATH)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return CompletionCache(
+        path,
+        profile,
+        prompt_fingerprint(chat_prompt, request_params),
+        max_bytes=int(float(os.getenv("CACHE_MAX_MB", "500")) * 1024 * 1024),
+        max_age_days=float(os.getenv("CACHE_MAX_AGE_DAYS", "90")),
+    )
@@ -0,0 +1,98 @@
+"""Per-row results saved as they finish, so interrupted runs can resume."""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+def row_key(index, title, text):
+    """Identity of a row: its position plus a hash of the article it contains.
+
+    If the sheet is edited between runs, changed rows get a new key and are
+    converted again instead of picking up a stale result.
+    """
+    digest = hashlib.sha256(f"{title}\x00{text}".encode("utf-8")).hexdigest()[:16]
+    return f"{index}:{digest}"
+
+
+def default_checkpoint_path(input_file, profile):
+    """Checkpoint file kept next to the input, e.g. articles.xlsx.html.checkpoint.sqlite"""
+    return f"{input_file}.{profile}.checkpoint.sqlite"
+
+
+class CheckpointStore:
+    """Per-row results persisted in SQLite as soon as each row finishes.
+
+    Every finished row is committed right away, so a crash, a Ctrl-C or a
+    cancelled save dialog only loses the requests that were still in flight.
+    Rows are stored as JSON dictionaries of the output columns.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                row_key TEXT PRIMARY KEY,
+                row_index INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._connection.commit()
+
+    def completed(self, keys):
+        """Results of the given rows that finished successfully, as {row_key: {column: value}}.
+
+        Only the requested rows are loaded, so a chunk of a large sheet can be
+        looked up without reading the whole checkpoint into memory.
+        """
+        keys = list(keys)
+        found = {}
+        # Stay well below SQLite's limit on query parameters
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self._connection.execute(
+                "SELECT row_key, result FROM results WHERE status = 'done' "
+                f"AND row_key IN ({', '.join('?' * len(batch))})",
+                batch,
+            )
+            found.update((key, json.loads(result)) for key, result in rows)
+        return found
+
+    def mark_done(self, key, index, result):
+        self._write(key, index, "done", json.dumps(result, ensure_ascii=False), None)
+
+    def mark_failed(self, key, index, error):
+        self._write(key, index, "failed", None, str(error))
+
+    def _write(self, key, index, status, result, error):
+        self._connection.execute(
+            "INSERT OR REPLACE INTO results (row_key, row_index, status, result, error, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, int(index), status, result, error, time.time()),
+        )
+        self._connection.commit()
+
+    def counts(self):
+        """Number of stored rows per status, e.g. {'done': 1500, 'failed': 3}."""
+        rows = self._connection.execute("SELECT status, COUNT(*) FROM results GROUP BY status")
+        return dict(rows.fetchall())
+
+    def close(self):
+        self._connection.close()
+
+
+def open_checkpoint(input_file, profile, path=None):
+    path = path or default_checkpoint_path(input_file, profile)
+    existed = os.path.exists(path)
+    store = CheckpointStore(path)
+    if existed:
+        print(f"Using checkpoint file: {path} ({store.counts()})")
+    else:
+        print(f"Writing checkpoint file: {path}")
+    return store
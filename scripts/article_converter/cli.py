@@ -0,0 +1,101 @@
+"""Headless command line entry point, for cron jobs and batch workers.
+
+    python -m article_converter html articles.csv -o articles_html.xlsx
+    python -m article_converter wordpress articles.xlsx -o posts.csv --resume
+
+Only argparse is imported until the arguments are parsed, so --help and
+argument errors return immediately.
+"""
+import argparse
+import sys
+
+from .profiles import PROFILE_NAMES
+from .spreadsheet import DEFAULT_CHUNK_SIZE
+
+
+def add_run_options(parser):
+    """Options shared by the command line and the file dialog scripts."""
+    parser.add_argument("--resume", action="store_true",
+                        help="skip rows already converted in the checkpoint file and only re-run the rest")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: next to the input file)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always call Azure instead of reusing answers from the completion cache")
+    parser.add_argument("--cache", help="completion cache file (default: $COMPLETION_CACHE or ~/.cache)")
+    parser.add_argument("--batch", action="store_true",
+                        help="submit the articles as one Azure OpenAI Batch API job instead of one request each")
+    parser.add_argument("--poll-interval", type=float, default=60,
+                        help="seconds between batch status checks (default: 60)")
+    parser.add_argument("--concurrency", type=int,
+                        help="parallel requests (default: $MAX_CONCURRENCY or 4)")
+    parser.add_argument("--rpm", type=int, help="requests-per-minute quota (default: $RATE_LIMIT_RPM)")
+    parser.add_argument("--tpm", type=int, help="tokens-per-minute quota (default: $RATE_LIMIT_TPM)")
+    parser.add_argument("--max-retries", type=int, help="retries per request (default: $MAX_RETRIES or 6)")
+    parser.add_argument("--prompt-budget", type=int,
+                        help="max input tokens per request; few-shot examples are dropped to fit "
+                             "(default: $PROMPT_TOKEN_BUDGET or no limit)")
+    parser.add_argument("--section-tokens", type=int,
+                        help="split articles longer than this many tokens into sections "
+                             "(default: $SECTION_TOKEN_LIMIT or 2000, 0 = never)")
+    parser.add_argument("--max-repairs", type=int,
+                        help="repair rounds for answers that break the profile's rules "
+                             "(default: $MAX_REPAIRS or 2, 0 = keep them as they are)")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream the answers to measure the time to first token")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="write per-request metrics to PATH (.jsonl, or .csv) (default: $METRICS_TRACE)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"rows read, converted and written at a time (default: {DEFAULT_CHUNK_SIZE})")
+
+
+def options_from_args(args):
+    from .converter import ConversionOptions
+
+    return ConversionOptions(
+        resume=args.resume,
+        checkpoint_path=args.checkpoint,
+        use_cache=not args.no_cache,
+        cache_path=args.cache,
+        batch=args.batch,
+        poll_interval=args.poll_interval,
+        max_workers=args.concurrency,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        max_retries=args.max_retries,
+        chunk_size=args.chunk_size,
+        prompt_budget=args.prompt_budget,
+        section_tokens=args.section_tokens,
+        max_repairs=args.max_repairs,
+        stream=args.stream,
+        trace_path=args.trace,
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="article_converter",
+        description="Convert Japan travel articles with Azure OpenAI.",
+    )
+    parser.add_argument("profile", choices=PROFILE_NAMES,
+                        help="html: standalone HTML page per article; wordpress: WordPress post fields")
+    parser.add_argument("input", help="input sheet (.xlsx, .xls or .csv) with Title and Text columns")
+    parser.add_argument("-o", "--output", required=True,
+                        help="output file; .xlsx is written as Excel, anything else as CSV")
+    add_run_options(parser)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    from .converter import convert
+    from .spreadsheet import InputFileError
+
+    try:
+        convert(args.profile, args.input, args.output, options_from_args(args))
+    except InputFileError as e:
+        print(str(e), file=sys.stderr)
+        print("Please ensure your file is properly formatted.", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
@@ -0,0 +1,37 @@
+"""Azure OpenAI client setup shared by every entry point."""
+import os
+
+DEFAULT_ENDPOINT = "https://azureopenaiapigiorgio.openai.azure.com/"
+# Structured outputs (response_format json_schema) need 2024-08-01-preview or later
+DEFAULT_API_VERSION = "2024-10-21"
+DEFAULT_BATCH_API_VERSION = "2024-10-21"
+
+
+def load_settings():
+    """Read ENDPOINT_URL, DEPLOYMENT_NAME and AZURE_OPENAI_API_KEY, from .env if present."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return {
+        "endpoint": os.getenv("ENDPOINT_URL", DEFAULT_ENDPOINT),
+        "deployment": os.getenv("DEPLOYMENT_NAME", "gpt-4o"),
+        "batch_deployment": os.getenv("BATCH_DEPLOYMENT_NAME") or os.getenv("DEPLOYMENT_NAME", "gpt-4o"),
+        "api_key": os.getenv("AZURE_OPENAI_API_KEY"),
+    }
+
+
+def make_client(settings, batch=False):
+    from openai import AzureOpenAI
+
+    if batch:
+        return AzureOpenAI(
+            azure_endpoint=settings["endpoint"],
+            api_key=settings["api_key"],
+            api_version=os.getenv("BATCH_API_VERSION", DEFAULT_BATCH_API_VERSION),
+        )
+    return AzureOpenAI(
+        azure_endpoint=settings["endpoint"],
+        api_key=settings["api_key"],
+        api_version=os.getenv("API_VERSION", DEFAULT_API_VERSION),
+        max_retries=0,  # retries are handled by ChatRunner so it can honour Retry-After
+    )
@@ -0,0 +1,460 @@
+"""The conversion pipeline: read a sheet, convert every article, save the result.
+
+The sheet is streamed in chunks: each chunk is converted and written out
+before the next one is read, so memory stays bounded by the chunk size. Every
+finished row is also stored in the checkpoint file, which is what resuming,
+batch mode and saving after the fact (export) read from.
+"""
+import os
+from dataclasses import dataclass
+
+from .checkpoint import open_checkpoint, row_key
+from .profiles import get_profile
+from .spreadsheet import DEFAULT_CHUNK_SIZE
+
+
+@dataclass
+class ConversionOptions:
+    """How to run a conversion. None means "use the environment / default"."""
+
+    resume: bool = False
+    checkpoint_path: str = None
+    use_cache: bool = True
+    cache_path: str = None
+    batch: bool = False
+    poll_interval: float = 60
+    max_workers: int = None
+    requests_per_minute: int = None
+    tokens_per_minute: int = None
+    max_retries: int = None
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    prompt_budget: int = None
+    section_tokens: int = None
+    max_repairs: int = None
+    stream: bool = False
+    trace_path: str = None
+
+
+CUT_OFF = "the answer was cut off at max_tokens"
+
+
+class _Repair:
+    """A converted row waiting for its invalid fields to be fixed.
+
+    `cut_off` holds the fields of an answer cut off at max_tokens: a repair
+    can't restore the missing text, so they are not sent and stay invalid.
+    """
+
+    def __init__(self, values, problems, cut_off=()):
+        self.values = values
+        self.problems = problems
+        self.cut_off = set(cut_off)
+        self.attempts = 0
+        self.waiting = set()
+
+
+class _RowHandler:
+    """Callbacks for ChatRunner / run_batch: parse each answer, check it and checkpoint it.
+
+    Jobs are keyed by (row index, section). A long article split into several
+    sections is saved once all of its sections are back, merged by the profile.
+    An article whose answer was cut off at max_tokens is converted again in
+    twice as many sections (resplit_jobs). A row whose fields break the
+    profile's rules is held back and its invalid fields are sent again with
+    small repair requests (repair_jobs). Both are tried up to `max_repairs`
+    times before the row is saved as it is.
+    """
+
+    def __init__(self, profile, checkpoint, builder, max_repairs=2):
+        self.profile = profile
+        self.checkpoint = checkpoint
+        self.builder = builder
+        self.max_repairs = max_repairs
+        self.row_keys = {}
+        self.titles = {}
+        self.texts = {}
+        self.messages = {}
+        self.sections = {}
+        self.cut_off = set()
+        self.resplits = {}
+        self.resplit_attempts = {}
+        self.repairs = {}
+        self.results = {}
+        self.converted = 0
+        self.failed = 0
+        self.skipped = 0
+        self.repaired = 0
+        self.invalid = 0
+
+    def prepare(self, chunk, resume):
+        """Return the jobs for a chunk; rows done in an earlier run are taken from the checkpoint."""
+        keys = {index: row_key(index, row['Title'], row['Text']) for index, row in chunk.iterrows()}
+        already_done = self.checkpoint.completed(keys.values()) if resume else {}
+        jobs = []
+        for index, row in chunk.iterrows():
+            if keys[index] in already_done:
+                self.results[index] = already_done[keys[index]]
+                self.skipped += 1
+                continue
+            self.row_keys[index] = keys[index]
+            self.titles[index] = row['Title']
+            self.texts[index] = row['Text']
+            jobs.extend(self._jobs(index, self.builder.build(row['Title'], row['Text'])))
+        return jobs
+
+    def _jobs(self, index, requests):
+        self.sections[index] = [None] * len(requests)
+        jobs = []
+        for section, messages in enumerate(requests):
+            self.messages[index, section] = messages
+            jobs.append(((index, section), messages))
+        return jobs
+
+    def resplit_jobs(self):
+        """The requests for the articles whose answers were cut off, in twice as many sections."""
+        jobs = []
+        for index, sections in self.resplits.items():
+            requests = self.builder.rebuild(self.titles[index], self.texts[index], 2 * sections)
+            jobs.extend(self._jobs(index, requests))
+        self.resplits = {}
+        return jobs
+
+    def save_result(self, key, completion):
+        index, section = key
+        messages = self.messages.pop(key, None)
+        if getattr(completion, "cached", False) and messages is not None:
+            self.builder.served_from_cache(messages)
+        if index not in self.sections:
+            # Another section of this article already failed
+            return None
+        cut_off = completion.choices[0].finish_reason == "length"
+        try:
+            values = self.profile.parse_response(completion.choices[0].message.content)
+        except ValueError as e:
+            if not cut_off:
+                self._fail(index, f"Error parsing response for article {index + 1}: {str(e)}", e)
+                return False
+            values = {}
+
+        sections = self.sections[index]
+        sections[section] = values
+        if cut_off:
+            self.cut_off.add(index)
+        if any(part is None for part in sections):
+            return None
+        del self.sections[index]
+        if index in self.cut_off:
+            self.cut_off.discard(index)
+            attempts = self.resplit_attempts.get(index, 0)
+            if attempts < self.max_repairs:
+                # A repair can't bring back the missing text; shorter sections give shorter answers
+                self.resplit_attempts[index] = attempts + 1
+                self.resplits[index] = len(sections)
+                return None
+            if not all(sections):
+                self._fail(index, f"Error processing article {index + 1}: {CUT_OFF}", ValueError(CUT_OFF))
+                return None
+            cut_off = True
+        if len(sections) > 1:
+            values = self.profile.merge_sections(sections)
+        values = self.profile.autofix(values)
+        problems = self.profile.validate(values)
+        columns = self.profile.OUTPUT_COLUMNS
+        cut_off_columns = []
+        if cut_off and all(str(values.get(column) or '').strip() for column in columns):
+            # The last field may be incomplete however it parses. A field left
+            # unfinished is dropped by the parser and reported empty anyway.
+            cut_off_columns = [columns[-1]]
+            problems.setdefault(columns[-1], []).append(CUT_OFF)
+        if problems and self.max_repairs > 0:
+            self.repairs[index] = _Repair(values, problems, cut_off_columns)
+        else:
+            self._save(index, values, problems)
+
+    def repair_jobs(self):
+        """The repair requests for the rows held back; rows out of attempts are saved as they are."""
+        jobs = []
+        for index, repair in list(self.repairs.items()):
+            if repair.waiting:
+                continue
+            repairable = {column: problems for column, problems in repair.problems.items()
+                          if column not in repair.cut_off}
+            if repair.attempts >= self.max_repairs or not repairable:
+                del self.repairs[index]
+                self._save(index, repair.values, repair.problems)
+                continue
+            repair.attempts += 1
+            for column, problems in repairable.items():
+                repair.waiting.add(column)
+                jobs.append(((index, column), self.profile.repair_messages(column, repair.values, problems)))
+        return jobs
+
+    def save_repair(self, key, completion):
+        index, column = key
+        repair = self.repairs[index]
+        accepted = False
+        if completion.choices[0].finish_reason == "length":
+            print(f"Could not repair {column} of article {index + 1}: {CUT_OFF}")
+        else:
+            try:
+                repair.values[column] = self.profile.parse_repair(column, completion.choices[0].message.content)
+                accepted = None
+            except ValueError as e:
+                print(f"Could not repair {column} of article {index + 1}: {str(e)}")
+        self._repair_done(index, column)
+        return accepted
+
+    def report_repair_error(self, key, error):
+        index, column = key
+        print(f"Error repairing {column} of article {index + 1}: {str(error)}")
+        self._repair_done(index, column)
+
+    def _repair_done(self, index, column):
+        repair = self.repairs[index]
+        repair.waiting.discard(column)
+        if repair.waiting:
+            return
+        repair.values = self.profile.autofix(repair.values)
+        repair.problems = self.profile.validate(repair.values)
+        for cut_off in repair.cut_off:
+            repair.problems.setdefault(cut_off, []).append(CUT_OFF)
+        if not repair.problems:
+            del self.repairs[index]
+            self.repaired += 1
+            self._save(index, repair.values, {})
+
+    def _save(self, index, values, problems):
+        self.results[index] = values
+        self.texts.pop(index, None)
+        self.resplit_attempts.pop(index, None)
+        self.checkpoint.mark_done(self.row_keys.pop(index), index, values)
+        self.converted += 1
+        print(f"Successfully processed article {index + 1}: {self.titles.pop(index, '')}")
+        if problems:
+            self.invalid += 1
+            for column, issues in problems.items():
+                print(f"  warning: {column}: {'; '.join(issues)}")
+
+    def report_error(self, key, error):
+        index = key[0]
+        self.messages.pop(key, None)
+        if index in self.sections:
+            self._fail(index, f"Error processing article {index + 1}: {str(error)}", error)
+
+    def _fail(self, index, message, error):
+        print(message)
+        self.sections.pop(index, None)
+        self.cut_off.discard(index)
+        self.texts.pop(index, None)
+        self.resplit_attempts.pop(index, None)
+        self.checkpoint.mark_failed(self.row_keys.pop(index), index, error)
+        self.titles.pop(index, None)
+        self.failed += 1
+
+    def take_results(self, chunk):
+        """The chunk with the profile's output columns filled in from the finished rows."""
+        chunk = _with_results(chunk, self.results, self.profile.OUTPUT_COLUMNS)
+        self.results = {}
+        return chunk
+
+
+def _run_resplits(handler, runner, metrics):
+    # Articles cut off at max_tokens go again in smaller sections until they fit
+    with metrics.phase("requests"):
+        jobs = handler.resplit_jobs()
+        while jobs:
+            print(f"Converting {len(jobs)} smaller sections of articles that were cut off...")
+            runner.run(jobs, handler.save_result, handler.report_error)
+            jobs = handler.resplit_jobs()
+
+
+def _run_repairs(handler, runner, metrics):
+    # Each round only sends the fields that are still invalid
+    with metrics.phase("repairs"):
+        jobs = handler.repair_jobs()
+        while jobs:
+            print(f"Repairing {len(jobs)} invalid fields...")
+            runner.run(jobs, handler.save_repair, handler.report_repair_error)
+            jobs = handler.repair_jobs()
+
+
+def _with_results(chunk, results, columns):
+    chunk = chunk.copy()
+    for column in columns:
+        if column not in chunk.columns:
+            chunk[column] = None
+        chunk[column] = chunk[column].astype(object)
+    for index, values in results.items():
+        if index in chunk.index:
+            for column, value in values.items():
+                chunk.at[index, column] = value
+    return chunk
+
+
+def convert(profile, input_file, output_file=None, options=None, settings=None):
+    """Convert every article of `input_file` with the given profile ("html" or "wordpress").
+
+    The sheet is read and, if `output_file` is given, written chunk by chunk
+    with the profile's output columns filled in. Finished rows are written to
+    the checkpoint file as they complete, so an interrupted run can be picked
+    up again with `options.resume`, and `export()` can save the results later.
+    Returns a summary with the number of converted, failed and skipped rows
+    and the run's metrics (latencies, tokens, estimated cost). Raises
+    spreadsheet.InputFileError if the sheet can't be read.
+    """
+    from .client import load_settings
+    from .metrics import MetricsRecorder
+    from .prompt_builder import PromptBuilder, prompt_settings_from_env
+    from .spreadsheet import ResultWriter, read_chunks
+
+    options = options or ConversionOptions()
+    profile = get_profile(profile) if isinstance(profile, str) else profile
+    settings = settings or load_settings()
+    deployment = settings["batch_deployment"] if options.batch else settings["deployment"]
+
+    prompt_settings = prompt_settings_from_env()
+    builder = PromptBuilder(
+        profile,
+        deployment,
+        prompt_budget=_first_set(options.prompt_budget, prompt_settings["prompt_budget"]),
+        section_tokens=_first_set(options.section_tokens, prompt_settings["section_tokens"]),
+    )
+    checkpoint = open_checkpoint(input_file, profile.NAME, options.checkpoint_path)
+    max_repairs = _first_set(options.max_repairs, int(os.getenv("MAX_REPAIRS", "2")))
+    handler = _RowHandler(profile, checkpoint, builder, max_repairs=max_repairs)
+    cache = _open_cache(profile, options)
+    metrics = MetricsRecorder(options.trace_path or os.getenv("METRICS_TRACE") or None)
+    try:
+        if options.batch:
+            _convert_with_batch(profile, input_file, handler, cache, metrics, options, settings, deployment)
+            if output_file:
+                with metrics.phase("write"):
+                    _export(profile, input_file, output_file, checkpoint, options.chunk_size)
+        else:
+            runner = _make_runner(profile, cache, metrics, options, settings, deployment)
+            repair_runner = runner.with_params(profile.REPAIR_PARAMS, kind="repair")
+            writer = ResultWriter(output_file) if output_file else None
+            print(f"\nProcessing articles with {runner.max_workers} parallel requests...")
+            try:
+                for chunk in metrics.timed(read_chunks(input_file, options.chunk_size), "read"):
+                    with metrics.phase("requests"):
+                        runner.run(handler.prepare(chunk, options.resume), handler.save_result, handler.report_error)
+                    _run_resplits(handler, runner, metrics)
+                    _run_repairs(handler, repair_runner, metrics)
+                    chunk = handler.take_results(chunk)
+                    if writer is not None:
+                        with metrics.phase("write"):
+                            writer.write(chunk)
+                if writer is not None:
+                    with metrics.phase("write"):
+                        writer.close()
+            except BaseException:
+                # Converted rows stay in the checkpoint; the output file is left as it was
+                if writer is not None:
+                    writer.discard()
+                raise
+    except KeyboardInterrupt:
+        print(f"\nInterrupted. Finished articles are kept in {checkpoint.path}")
+        if options.batch:
+            print("Submitted batches keep running on Azure; run again with --batch --resume to collect them.")
+        else:
+            print("Run again with --resume to continue where you left off.")
+        raise
+    finally:
+        checkpoint.close()
+        metrics.close()
+        if cache is not None:
+            _print_cache_stats(cache)
+            cache.close()
+
+    builder.print_report(metrics.cached_tokens)
+    metrics.print_summary()
+    summary = {"converted": handler.converted, "failed": handler.failed, "skipped": handler.skipped,
+               "repaired": handler.repaired, "invalid": handler.invalid, "prompt": builder.report(),
+               "metrics": metrics.summary()}
+    if options.resume:
+        print(f"\nResumed: {handler.skipped} articles taken from the checkpoint")
+    print(f"Converted {handler.converted} articles, {handler.failed} failed")
+    if handler.repaired or handler.invalid:
+        print(f"Repaired {handler.repaired} articles, {handler.invalid} saved with fields breaking the rules")
+    return summary
+
+
+def export(profile, input_file, output_file, options=None):
+    """Save the sheet with the results stored in the checkpoint file, without calling Azure."""
+    options = options or ConversionOptions()
+    profile = get_profile(profile) if isinstance(profile, str) else profile
+    checkpoint = open_checkpoint(input_file, profile.NAME, options.checkpoint_path)
+    try:
+        _export(profile, input_file, output_file, checkpoint, options.chunk_size)
+    finally:
+        checkpoint.close()
+
+
+def _export(profile, input_file, output_file, checkpoint, chunk_size):
+    from .spreadsheet import ResultWriter, read_chunks
+
+    with ResultWriter(output_file) as writer:
+        for chunk in read_chunks(input_file, chunk_size):
+            keys = {index: row_key(index, row['Title'], row['Text']) for index, row in chunk.iterrows()}
+            done = checkpoint.completed(keys.values())
+            results = {index: done[key] for index, key in keys.items() if key in done}
+            writer.write(_with_results(chunk, results, profile.OUTPUT_COLUMNS))
+
+
+def _convert_with_batch(profile, input_file, handler, cache, metrics, options, settings, deployment):
+    from .batch import default_state_path, run_batch
+    from .client import make_client
+    from .spreadsheet import read_chunks
+
+    # Only the requests are kept; the answers go straight to the checkpoint file
+    jobs = []
+    for chunk in metrics.timed(read_chunks(input_file, options.chunk_size), "read"):
+        jobs.extend(handler.prepare(chunk, options.resume))
+        handler.results = {}
+    print(f"\nSubmitting {len(jobs)} articles to the Batch API...")
+    with metrics.phase("batch"):
+        run_batch(make_client(settings, batch=True), deployment, profile.REQUEST_PARAMS, jobs,
+                  handler.save_result, handler.report_error, default_state_path(input_file, profile.NAME),
+                  cache=cache, poll_interval=options.poll_interval, metrics=metrics)
+    if handler.resplits or handler.repairs:
+        # The few resplits and repairs are sent right away instead of waiting for another batch
+        runner = _make_runner(profile, cache, metrics, options, settings, settings["deployment"])
+        _run_resplits(handler, runner, metrics)
+        _run_repairs(handler, runner.with_params(profile.REPAIR_PARAMS, kind="repair"), metrics)
+    handler.results = {}
+
+
+def _first_set(*values):
+    return next((value for value in values if value is not None), None)
+
+
+def _open_cache(profile, options):
+    # Articles converted before with the same prompt are answered from the completion cache
+    if not options.use_cache:
+        return None
+    from .cache import open_cache
+
+    return open_cache(profile.NAME, profile.CHAT_PROMPT, profile.REQUEST_PARAMS, options.cache_path)
+
+
+def _make_runner(profile, cache, metrics, options, settings, deployment):
+    from .client import make_client
+    from .runner import ChatRunner
+
+    # Send the requests concurrently within the deployment's quota
+    request_params = dict(profile.REQUEST_PARAMS, stream=True) if options.stream else profile.REQUEST_PARAMS
+    return ChatRunner.from_env(
+        make_client(settings), deployment, request_params, cache=cache, metrics=metrics,
+        max_workers=options.max_workers,
+        requests_per_minute=options.requests_per_minute,
+        tokens_per_minute=options.tokens_per_minute,
+        max_retries=options.max_retries,
+    )
+
+
+def _print_cache_stats(cache):
+    stats = cache.stats()
+    print(f"\nCompletion cache: {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries, "
+          f"{stats['bytes'] / 1024 / 1024:.1f} MB")
@@ -0,0 +1,78 @@
+"""File dialog front end used by the two desktop scripts."""
+import argparse
+
+from .cli import add_run_options, options_from_args
+
+DESCRIPTIONS = {
+    "html": "Convert articles to HTML with Azure OpenAI",
+    "wordpress": "Convert articles to WordPress posts with Azure OpenAI",
+}
+
+
+def main(profile, argv=None):
+    """Ask for the input file, convert it with `profile` and ask where to save the result."""
+    parser = argparse.ArgumentParser(description=DESCRIPTIONS[profile])
+    add_run_options(parser)
+    args = parser.parse_args(argv)
+
+    import tkinter as tk
+    from tkinter import filedialog
+
+    from .converter import convert, export
+    from .spreadsheet import InputFileError
+
+    # Create and hide the root window for file dialogs
+    root = tk.Tk()
+    root.withdraw()
+
+    # Open file dialog for selecting input file
+    print("Please select your input file...")
+    input_file = filedialog.askopenfilename(
+        title="Select file to process",
+        filetypes=[
+            ("Excel files", "*.xlsx"),
+            ("Excel 97-2003 files", "*.xls"),
+            ("CSV files", "*.csv"),
+            ("All files", "*.*")
+        ]
+    )
+
+    if not input_file:
+        print("No file selected. Exiting...")
+        return 0
+
+    options = options_from_args(args)
+    try:
+        convert(profile, input_file, options=options)
+    except InputFileError as e:
+        print(str(e))
+        print("Please ensure your file is properly formatted.")
+        return 1
+    except KeyboardInterrupt:
+        return 1
+
+    # Save the processed file
+    print("\nPlease select where to save the processed file...")
+    output_file = filedialog.asksaveasfilename(
+        defaultextension=".xlsx",
+        initialfile="processed_articles.xlsx",
+        title="Save processed file as",
+        filetypes=[
+            ("Excel files", "*.xlsx"),
+            ("CSV files", "*.csv"),
+            ("All files", "*.*")
+        ]
+    )
+
+    if output_file:
+        # The results are read back from the checkpoint file, together with the input sheet
+        try:
+            export(profile, input_file, output_file, options)
+        except Exception as e:
+            print(f"Error saving file: {str(e)}")
+            return 1
+    else:
+        print("\nSave cancelled. No file was created.")
+        print("Converted articles are kept in the checkpoint file; run again with --resume "
+              "to save them without new API calls.")
+    return 0
@@ -0,0 +1,260 @@
+"""Per-request timings, token counts and cost: a trace file and a summary at the end of a run.
+
+ChatRunner and run_batch hand a RequestRecord to the MetricsRecorder for every
+request. The recorder appends it to the trace (JSON lines, or CSV if the path
+ends in .csv) and keeps the numbers the summary needs. If the OpenTelemetry
+API is installed, every request is also reported as a "chat" span; without a
+configured SDK those spans cost nothing.
+"""
+import csv
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
+
+# Azure OpenAI list prices in USD per million tokens (gpt-4o 2024-08-06, global
+# standard). Override with PRICE_INPUT_PER_1M, PRICE_CACHED_INPUT_PER_1M and
+# PRICE_OUTPUT_PER_1M for other models or deployment types.
+DEFAULT_PRICES = {"input": 2.50, "cached_input": 1.25, "output": 10.00}
+# The Batch API costs half the standard price
+BATCH_DISCOUNT = 0.5
+
+
+@dataclass
+class RequestRecord:
+    """What happened to one request.
+
+    `row` is the article number as printed in the log (sheet index + 1) and
+    `part` the section or repaired field. Times are in seconds; `started_at`
+    is a Unix timestamp. For ChatRunner requests the clock starts when the job
+    is submitted: `queue_seconds` is the wait for a free worker plus the wait
+    for the rate limiter, and `wall_seconds` includes both.
+    """
+
+    row: int
+    part: object
+    kind: str
+    model: str
+    started_at: float
+    status: str = "ok"
+    wall_seconds: float = None
+    queue_seconds: float = 0.0
+    latency_seconds: float = None
+    ttft_seconds: float = None
+    retries: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    finish_reason: str = None
+    error: str = None
+
+    @classmethod
+    def for_key(cls, key, kind, model):
+        index, part = key if isinstance(key, tuple) else (key, None)
+        row = index + 1 if isinstance(index, int) else index
+        return cls(row=row, part=part, kind=kind, model=model, started_at=time.time())
+
+    def read_completion(self, completion):
+        """Take the finish reason and the token counts from `usage`; a cached answer has none."""
+        if getattr(completion, "cached", False):
+            self.status = "cached"
+        choices = getattr(completion, "choices", None) or []
+        if choices:
+            self.finish_reason = choices[0].finish_reason
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            self.prompt_tokens = usage.prompt_tokens or 0
+            self.completion_tokens = usage.completion_tokens or 0
+            details = getattr(usage, "prompt_tokens_details", None)
+            self.cached_tokens = getattr(details, "cached_tokens", None) or 0
+
+    def cost(self, prices):
+        uncached = self.prompt_tokens - self.cached_tokens
+        cost = (uncached * prices["input"] + self.cached_tokens * prices["cached_input"]
+                + self.completion_tokens * prices["output"]) / 1_000_000
+        return cost * BATCH_DISCOUNT if self.kind == "batch" else cost
+
+
+def percentile(values, share):
+    """Nearest-rank percentile of a list of numbers; None if it is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+def prices_from_env():
+    return {
+        "input": float(os.getenv("PRICE_INPUT_PER_1M", DEFAULT_PRICES["input"])),
+        "cached_input": float(os.getenv("PRICE_CACHED_INPUT_PER_1M", DEFAULT_PRICES["cached_input"])),
+        "output": float(os.getenv("PRICE_OUTPUT_PER_1M", DEFAULT_PRICES["output"])),
+    }
+
+
+def _tracer():
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    return trace.get_tracer("article_converter")
+
+
+class MetricsRecorder:
+    """Collects the RequestRecords of a run; safe to call from the runner's worker threads.
+
+    `trace_path` receives one line per request as it finishes. Only the
+    latencies are kept in memory, so large sheets don't grow it much.
+    """
+
+    def __init__(self, trace_path=None, prices=None):
+        self.trace_path = trace_path
+        self.prices = prices or prices_from_env()
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.requests = {"ok": 0, "cached": 0, "error": 0}
+        self.retries = 0
+        self.finish_reasons = {}
+        self.truncated = []
+        self.latencies = []
+        self.walls = []
+        self.ttfts = []
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self._lock = threading.Lock()
+        self._tracer = _tracer()
+        self._trace_file = None
+        self._csv = None
+        if trace_path:
+            self._trace_file = open(trace_path, "w", encoding="utf-8", newline="")
+            if trace_path.lower().endswith(".csv"):
+                self._csv = csv.DictWriter(self._trace_file, fieldnames=[f.name for f in fields(RequestRecord)])
+                self._csv.writeheader()
+
+    def record(self, record):
+        if record.finish_reason == "length":
+            print(f"Warning: the answer for article {record.row} was cut off at max_tokens")
+        with self._lock:
+            self.requests[record.status] = self.requests.get(record.status, 0) + 1
+            self.retries += record.retries
+            if record.finish_reason:
+                self.finish_reasons[record.finish_reason] = self.finish_reasons.get(record.finish_reason, 0) + 1
+            if record.finish_reason == "length":
+                self.truncated.append(record.row)
+            if record.status == "ok":
+                if record.latency_seconds is not None:
+                    self.latencies.append(record.latency_seconds)
+                if record.wall_seconds is not None:
+                    self.walls.append(record.wall_seconds)
+                if record.ttft_seconds is not None:
+                    self.ttfts.append(record.ttft_seconds)
+            self.prompt_tokens += record.prompt_tokens
+            self.cached_tokens += record.cached_tokens
+            self.completion_tokens += record.completion_tokens
+            self.cost += record.cost(self.prices)
+            if self._csv is not None:
+                self._csv.writerow(asdict(record))
+            elif self._trace_file is not None:
+                self._trace_file.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+        if self._tracer is not None:
+            self._span(record)
+
+    def _span(self, record):
+        from opentelemetry.trace import Status, StatusCode
+
+        start_ns = int(record.started_at * 1e9)
+        span = self._tracer.start_span(f"chat {record.model}", start_time=start_ns)
+        span.set_attributes({
+            "gen_ai.operation.name": "chat",
+            "gen_ai.system": "az.ai.openai",
+            "gen_ai.request.model": record.model,
+            "gen_ai.usage.input_tokens": record.prompt_tokens,
+            "gen_ai.usage.output_tokens": record.completion_tokens,
+            "article_converter.row": record.row,
+            "article_converter.kind": record.kind,
+            "article_converter.status": record.status,
+            "article_converter.retries": record.retries,
+            "article_converter.queue_seconds": record.queue_seconds,
+        })
+        if record.finish_reason:
+            span.set_attribute("gen_ai.response.finish_reasons", [record.finish_reason])
+        if record.ttft_seconds is not None:
+            span.set_attribute("article_converter.ttft_seconds", record.ttft_seconds)
+        if record.error:
+            span.set_status(Status(StatusCode.ERROR, record.error))
+        span.end(end_time=start_ns + int((record.wall_seconds or 0) * 1e9))
+
+    @contextmanager
+    def phase(self, name):
+        """Add the time spent in the block to the phase `name` (read, requests, repairs, write)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def timed(self, iterable, name):
+        """Iterate over `iterable`, counting the time spent producing each item as phase `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def close(self):
+        if self._trace_file is not None:
+            self._trace_file.close()
+            self._trace_file = None
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "elapsed_seconds": elapsed,
+            "phases": dict(self.phases),
+            "requests": dict(self.requests),
+            "retries": self.retries,
+            "finish_reasons": dict(self.finish_reasons),
+            "truncated_rows": sorted(self.truncated),
+            "latency_p50": percentile(self.latencies, 0.5),
+            "latency_p95": percentile(self.latencies, 0.95),
+            "wall_p50": percentile(self.walls, 0.5),
+            "wall_p95": percentile(self.walls, 0.95),
+            "ttft_p50": percentile(self.ttfts, 0.5),
+            "ttft_p95": percentile(self.ttfts, 0.95),
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "completion_tokens": self.completion_tokens,
+            "completion_tokens_per_second": self.completion_tokens / elapsed if elapsed else 0.0,
+            "estimated_cost": self.cost,
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        requests = summary["requests"]
+        if not sum(requests.values()):
+            return
+        print(f"\nRequests: {requests['ok']:,} sent, {requests['cached']:,} from the completion cache, "
+              f"{requests['error']:,} failed, {summary['retries']:,} retries")
+        if summary["latency_p50"] is not None:
+            print(f"  latency p50 {summary['latency_p50']:.2f}s, p95 {summary['latency_p95']:.2f}s "
+                  f"(with queueing and retries: p50 {summary['wall_p50']:.2f}s, p95 {summary['wall_p95']:.2f}s)")
+        if summary["ttft_p50"] is not None:
+            print(f"  time to first token p50 {summary['ttft_p50']:.2f}s, p95 {summary['ttft_p95']:.2f}s")
+        print(f"  tokens: {summary['prompt_tokens']:,} prompt ({summary['cached_tokens']:,} cached), "
+              f"{summary['completion_tokens']:,} completion, "
+              f"{summary['completion_tokens_per_second']:.1f} completion tokens/s")
+        if summary["truncated_rows"]:
+            rows = ", ".join(str(row) for row in summary["truncated_rows"][:20])
+            print(f"  cut off at max_tokens: {len(summary['truncated_rows'])} answers (articles {rows})")
+        phases = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in summary["phases"].items())
+        print(f"  time: {summary['elapsed_seconds']:.1f}s" + (f" ({phases})" if phases else ""))
+        print(f"  estimated cost: ${summary['estimated_cost']:.2f}")
+        if self.trace_path:
+            print(f"  per-request trace: {self.trace_path}")
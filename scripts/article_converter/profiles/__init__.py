@@ -0,0 +1,21 @@
+"""Prompt profiles: what to ask the model for and how to read its answer.
+
+Each profile module defines NAME, CHAT_PROMPT (system message plus few-shot
+examples), EXAMPLE_MESSAGES (the slice of CHAT_PROMPT holding the examples),
+REQUEST_PARAMS, OUTPUT_COLUMNS, parse_response(content) and
+merge_sections(parts). Answers are checked with autofix(values) and
+validate(values); a field that still breaks a rule is sent back with
+repair_messages(column, values, problems) and REPAIR_PARAMS, and the answer
+read with parse_repair(column, content). They are imported on first use so the large prompts
+are only loaded when needed.
+"""
+import importlib
+
+PROFILE_NAMES = ("html", "wordpress")
+
+
+def get_profile(name):
+    if name not in PROFILE_NAMES:
+        raise ValueError(f"Unknown profile '{name}', expected one of: {', '.join(PROFILE_NAMES)}")
+    return importlib.import_module(f"{__name__}.{name}")
+
@@ -0,0 +1,360 @@
+"""Profile "wordpress": rewrite each article as the fields of a WordPress post."""
+import json
+import re
+
+from ..validation import (
+    check_html, close_open_tags, has_emojis, has_links, parse_json_lenient, remove_emojis, remove_links,
+)
+
+NAME = "wordpress"
+
+# Columns written to the output sheet, one per key of the JSON answer
+OUTPUT_COLUMNS = ["post_title", "post_content", "post_excerpt", "post_category", "tags_input"]
+
+
+def _json_schema(name, keys):
+    # Structured outputs: every key is a required string and nothing else is allowed
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": name,
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {key: {"type": "string"} for key in keys},
+                "required": list(keys),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+# Sampling parameters used for every article. The answer is constrained to
+# the post's JSON schema, so it always parses.
+REQUEST_PARAMS = dict(
+    max_tokens=3000,
+    temperature=0.7,
+    top_p=0.95,
+    frequency_penalty=0,
+    presence_penalty=0,
+    stop=None,
+    stream=False,
+    response_format=_json_schema("wordpress_post", OUTPUT_COLUMNS)
+)
+
+# Repairs rewrite one field, answered as {"value": "..."}
+REPAIR_PARAMS = dict(
+    max_tokens=3000,
+    temperature=0.2,
+    stream=False,
+    response_format=_json_schema("repaired_field", ["value"])
+)
+
+# Define the system message
+SYSTEM_MESSAGE = """
+You are an editor for a WordPress website focused on Japan and tourism in Japan. Your task is to rewrite the given article into the following elements: post_title, post_content, post_excerpt, post_category, and tags_input. Follow these guidelines:
+- post_title: Create a concise, non-cliché title without words like 'discover', 'gem', 'explore'.
+- post_content: Use HTML with one <h2> tag for the main section, and <h3> or <h4> for subheadings. Bold important words in each paragraph (at least one per paragraph). Remove any links or emojis.
+- post_excerpt: Summarize the content concisely, avoiding unnecessary adjectives.
+- post_category: Use the location name, like 'Tokyo', or relevant categories like 'Food', 'Art', separated by commas if multiple.
+- tags_input: List relevant keywords separated by commas.
+Output the result in JSON format with keys for each element: post_title, post_content, post_excerpt, post_category, tags_input.
+"""
+
+# Define the examples using data from your provided table
+# Example 1: Naka-meguro
+EXAMPLE1_USER = """Naka-meguro
+
+# A Guide to Nakameguro - Tokyo’s Center of Cool 🌸🏙️
+
+[**Location on Google Maps**](https://maps.app.goo.gl/dy5Ji59DqfkB8LRAA)
+
+## **The Sophisticated Side of the City** ✨
+
+Centered around the **Meguro River** and within walking distance of the trendy districts of Daikanyama and Ebisu, Nakameguro holds its own in the sophistication stakes. The area is home to a range of **cool cafes and restaurants**, hip interior and accessory shops, and the **Nakameguro Koukashita**—700 meters of bars and stores anchored by the uber-modern bookstore **Nakameguro Tsutaya Books**. Nakameguro is a bustling bastion of cool throughout the year, but you'll find the crowds swell in late March and early April when the densely packed riverside cherry trees bud and blossom, creating an ultra-photogenic tunnel of pink.
+
+## **Cherry Blossom** 🌸
+
+At the end of March through early April, the cherry tree-lined **Meguro River** that slices through Nakameguro draws huge crowds buzzing with cherry blossom enthusiasm. The connecting trees on both sides of the river touch branches, creating a tunnel flanked by small stalls selling snacks and refreshing beers. Finding a quiet spot can be a challenge, especially at night when the trees are lit up. One way to avoid the crowds is to take a daytime or nighttime “**Hanami (Flower Viewing) Cruise**” that pushes off from Tennozu Isle’s Yamatsu Pier and travels to the area. While the cherry blossoms might be short-lived, the trees become a fresh, verdant green, offering you some well-needed shade from the intense summer heat.
+
+## **Nakameguro’s Starbucks Reserve ® Roastery Tokyo** ☕🌿
+
+Nakameguro’s **Starbucks Reserve® Roastery Tokyo** is one of only six Starbucks roasteries in the world. The building, designed by **Kengo Kuma**, contains a roasting factory, cocktail bar, tea floor, bakery, and cafe. The outdoor terrace is the perfect spot for viewing the cherry blossoms."""
+
+EXAMPLE1_ASSISTANT = """{
+  "post_title": "Nakameguro: Tokyo’s Riverside Scene",
+  "post_content": "<h2>Nakameguro Highlights</h2>\\n<p>Situated along the <strong>Meguro River</strong>, Nakameguro offers a mix of <strong>cafes</strong> and <strong>restaurants</strong> with a modern edge. Near Daikanyama and Ebisu, it’s packed with <strong>shops</strong> for accessories and decor, plus the <strong>Nakameguro Koukashita</strong>—a 700-meter strip of bars and stores beneath the tracks, featuring a standout bookstore.</p>\\n\\n<h3>Cherry Blossoms by the River</h3>\\n<p>Late March to early April brings crowds to the <strong>Meguro River</strong> for its <strong>cherry blossoms</strong>. Trees form a pink tunnel, lined with <strong>stalls</strong> selling snacks and drinks. A <strong>Hanami Cruise</strong> from Tennozu Isle’s Yamatsu Pier offers a crowd-free view, day or night. Summer turns the trees into a <strong>green</strong> shade provider.</p>\\n\\n<h3>Starbucks Roastery in Nakameguro</h3>\\n<p>The <strong>Starbucks Reserve® Roastery Tokyo</strong> stands out with its <strong>roastery</strong>, cocktail bar, tea lounge, bakery, and cafe. Designed by <strong>Kengo Kuma</strong>, its terrace is ideal for <strong>blossom</strong> viewing, blending coffee culture with local flair.</p>",
+  "post_excerpt": "Nakameguro features cafes, cherry blossoms along the Meguro River, and the Starbucks Reserve® Roastery Tokyo.",
+  "post_category": "Tokyo, Japan",
+  "tags_input": "Nakameguro, Meguro River, cherry blossoms, Tokyo tourism, Starbucks Roastery, trendy cafes, Hanami Cruise, Kengo Kuma"
+}"""
+
+# Example 2: Yanaka Ginza
+EXAMPLE2_USER = """Yanaka Ginza
+
+# **Discover the Retro Charm of Traditional Shopping Streets, Shotengai 🛍️🏙️**
+
+## **Shotengai: Tokyo's Hidden Treasure**
+
+The ancient Japanese shopping streets, known as **shotengai**, are slowly disappearing due to the rise of supermarkets and chain stores. However, examples like Yanaka Ginza show that some shotengai still manage to thrive, offering a unique retro charm.
+
+### **Yanaka Ginza: A Flourishing Shotengai**
+
+Located just steps from Nippori Station, about 15 minutes on the JR Yamanote Line from Tokyo Station, Yanaka Ginza is a vibrant example of shotengai. With its independent shops selling meat, fish, vegetables, ready-made food, tea, and traditional Japanese wagashi sweets made in small artisan batches, this street represents the best of tradition.
+
+### **Summer Festival and Local Community**
+
+During the early August summer festival, Yanaka Ginza reveals its crucial role in bringing together the local community, offering an authentic and engaging experience.
+
+### **A Balance of Tourism and Tradition**
+
+Although the street is popular among tourists, especially on weekends, visiting in the evening on a weekday reveals a predominance of local shoppers. The 175-meter-long street is famous for its atmosphere that takes you back in time, appealing to both Japanese and foreign visitors.
+
+### **Unique Shopping and Traditional Souvenirs**
+
+Yanaka Ginza is the ideal place to purchase reasonably priced traditional souvenirs, such as chopsticks, folding fans, or Japanese sweets, in an environment free of pushy sellers.
+
+### **A Dive into History: From Edo to Showa**
+
+Although sometimes presented as an Edo period (1603-1868) experience, the street mainly has an atmosphere from the mid-20th century, typical of the Showa period (1926-1989), and seems to have formed in its current shape immediately after World War II.
+
+### **Special Attractions: Cats and Panoramic View**
+
+- **Cats**: During less crowded periods, you can see cats roaming the street or admire the statues of the seven lucky cats along the way.
+- **Breathtaking View (_yūyake dandan_)**: At the beginning of the shopping street, there are stairs that offer a splendid view of the sunset. Despite an altitude of only 4.4 meters, these stairs allow you to observe the street from a different perspective, ideal for taking unforgettable photos."""
+
+EXAMPLE2_ASSISTANT = """{
+  "post_title": "Shotengai: Yanaka Ginza’s Retro Streets",
+  "post_content": "<h2>Shotengai and Yanaka Ginza Charm</h2>\\n<p>Traditional Japanese <strong>shopping streets</strong> called <strong>Shotengai</strong> are fading due to modern <strong>supermarkets</strong>. Yet, places like <strong>Yanaka Ginza</strong> in Tokyo thrive, showcasing a <strong>retro</strong> vibe with independent shops.</p>\\n\\n<h3>Yanaka Ginza Highlights</h3>\\n<p>Near Nippori Station, <strong>Yanaka Ginza</strong> offers a variety of <strong>shops</strong> selling meat, fish, vegetables, and <strong>wagashi</strong> sweets crafted by artisans. This <strong>street</strong> preserves Japan’s <strong>traditions</strong> in a vibrant setting.</p>\\n\\n<h3>Summer Festival Community</h3>\\n<p>In early August, Yanaka Ginza hosts a <strong>summer festival</strong> that unites the <strong>local community</strong>. It provides an <strong>authentic</strong> experience, highlighting the street’s cultural role.</p>\\n\\n<h3>Balancing Tourism and Local Life</h3>\\n<p>While <strong>tourists</strong> flock to Yanaka Ginza on weekends, weekday evenings reveal mostly <strong>local shoppers</strong>. The 175-meter <strong>street</strong> offers a nostalgic <strong>atmosphere</strong> appealing to all visitors.</p>\\n\\n<h3>Traditional Souvenirs Shopping</h3>\\n<p>Yanaka Ginza is perfect for buying <strong>traditional souvenirs</strong> like chopsticks, folding fans, and <strong>Japanese sweets</strong>. The <strong>shops</strong> maintain a relaxed, non-pushy environment.</p>\\n\\n<h3>Historical Ambiance</h3>\\n<p>The street reflects the <strong>Showa period</strong> (1926-1989), shaped post-World War II, rather than the Edo era. Its <strong>mid-20th-century</strong> feel immerses visitors in <strong>history</strong>.</p>\\n\\n<h3>Special Features</h3>\\n<p>During quieter times, <strong>cats</strong> roam the street, with statues of seven lucky cats on display. The <strong>stairs</strong> at the street’s start offer a <strong>sunset view</strong> at 4.4 meters high, ideal for photos.</p>",
+  "post_excerpt": "Yanaka Ginza offers retro Shotengai shopping with traditional souvenirs, wagashi sweets, and a Showa-period atmosphere.",
+  "post_category": "Tokyo",
+  "tags_input": "Shotengai, Yanaka Ginza, Tokyo tourism, traditional souvenirs, Japanese sweets, Showa period, summer festival, local community"
+}"""
+
+# Example 3: Omoide Yokocho
+EXAMPLE3_USER = """Omoide Yokocho
+
+# **Omoide Yokocho Shinjuku: A Slice of History in the Heart of Tokyo** 🏙️🍢
+
+## **A Maze of Narrow and Colorful Alleys**
+
+**Omoide Yokocho** in Shinjuku, Tokyo, is a labyrinth of small alleyways filled with izakaya-style restaurants, attracting both office workers and foreign visitors.
+
+## **Contrast with Shinjuku's Modernity** 🚉
+
+Despite Shinjuku station often being described as the busiest in the world and predominantly modern, Omoide Yokocho offers a stark contrast with its narrow lanes and traditional eateries. This maze of streets near the west exit of Shinjuku station feels like a step back in time, with its open barbecue stalls and a bustling, multicultural atmosphere.
+
+## **The History of Omoide Yokocho** 🕰️
+
+Translating to "Memory Lane," the area of Omoide Yokocho started as a large black market in the period immediately following World War II. The area, once dangerous, has transformed into a vibrant district of restaurants, retaining the rebellious spirit of the black market, yet now consisting of regularly licensed restaurants.
+
+## **Omoide Yokocho Today** 🌆
+
+Today, Omoide Yokocho is a safe and lively place to visit. It's the perfect spot to sit down, order a drink, and enjoy small typical dishes. The restaurants offer English menus, and the atmosphere is ideal for people-watching, a real spectacle in the heart of Tokyo that combines the tradition of local sumo wrestlers with the modernity of international tourists.
+
+## **Cuisine and Rules of Omoide Yokocho** 🍺
+
+Although there is a variety of food, the general rule in Omoide Yokocho is quick-prepared izakaya food, especially grilled: seafood, chicken (yakitori in all its variations), meat, and grilled offal. It's important to remember that it is necessary to order food with drinks here, and despite no smoking signs in the alleys, smoking is allowed while seated in the restaurants."""
+
+EXAMPLE3_ASSISTANT = """{
+  "post_title": "Omoide Yokocho: Shinjuku’s Historic Alleys",
+  "post_content": "<h2>Omoide Yokocho Atmosphere</h2>\\n<p>In Shinjuku, <strong>Omoide Yokocho</strong> is a maze of narrow <strong>alleys</strong> packed with <strong>izakaya</strong> restaurants. It draws <strong>office workers</strong> and international visitors with its lively, traditional vibe.</p>\\n\\n<h3>Contrast with Modern Shinjuku</h3>\\n<p>Near Shinjuku’s busy <strong>station</strong>, Omoide Yokocho stands out with its <strong>traditional</strong> eateries. The <strong>lanes</strong> near the west exit, filled with barbecue stalls, offer a <strong>retro</strong> escape from the area’s modern surroundings.</p>\\n\\n<h3>Historical Roots</h3>\\n<p>Known as Memory Lane, <strong>Omoide Yokocho</strong> began as a <strong>black market</strong> after World War II. Once a risky area, it’s now a vibrant <strong>district</strong> of licensed <strong>restaurants</strong> that keep its rebellious spirit alive.</p>\\n\\n<h3>A Lively Spot Today</h3>\\n<p>Now a safe destination, <strong>Omoide Yokocho</strong> is ideal for enjoying <strong>drinks</strong> and small dishes. With <strong>English menus</strong>, it’s great for people-watching, blending local <strong>sumo</strong> traditions with a global crowd.</p>\\n\\n<h3>Food and Customs</h3>\\n<p>The <strong>izakaya</strong> food here focuses on quick <strong>grilled</strong> dishes like seafood, yakitori, meat, and offal. Drinks must be ordered with <strong>food</strong>, and smoking is allowed at <strong>seats</strong> despite alleyway signs.</p>",
+  "post_excerpt": "Omoide Yokocho in Shinjuku features narrow alleys with izakaya restaurants, grilled dishes, and a retro atmosphere.",
+  "post_category": "Tokyo",
+  "tags_input": "Omoide Yokocho, Shinjuku, izakaya, Tokyo tourism, grilled food, black market history, traditional eateries, people-watching"
+}"""
+
+# Define the chat prompt with system message and examples
+CHAT_PROMPT = [
+    {
+        "role": "system",
+        "content": [
+            {"type": "text", "text": SYSTEM_MESSAGE}
+        ]
+    },
+    {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": EXAMPLE1_USER}
+        ]
+    },
+    {
+        "role": "assistant",
+        "content": [
+            {"type": "text", "text": EXAMPLE1_ASSISTANT}
+        ]
+    },
+    {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": EXAMPLE2_USER}
+        ]
+    },
+    {
+        "role": "assistant",
+        "content": [
+            {"type": "text", "text": EXAMPLE2_ASSISTANT}
+        ]
+    },
+    {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": EXAMPLE3_USER}
+        ]
+    },
+    {
+        "role": "assistant",
+        "content": [
+            {"type": "text", "text": EXAMPLE3_ASSISTANT}
+        ]
+    }
+]
+
+# All messages after the system message are example conversions, which may be
+# dropped from the end to save tokens.
+EXAMPLE_MESSAGES = slice(1, 7)
+
+_H2 = re.compile(r"<(/?)h2(\b[^>]*)>", re.IGNORECASE)
+_LEADING_HEADING = re.compile(r"^\s*<(h[12])\b[^>]*>(.*?)</\1>\s*", re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r"<[^>]+>")
+
+
+def _merge_list(values):
+    items = []
+    for value in values:
+        for item in str(value).split(','):
+            item = item.strip()
+            if item and item.lower() not in (existing.lower() for existing in items):
+                items.append(item)
+    return ", ".join(items)
+
+
+def _text(html):
+    return " ".join(_TAG.sub("", html).split()).lower()
+
+
+def merge_sections(parts):
+    """Join the posts converted from the sections of one long article.
+
+    Title and excerpt come from the first section. The content of every later
+    section is appended without a leading heading that repeats a post title
+    or the first section's heading, and any other <h2> is turned into <h3>,
+    so the post keeps a single <h2>. Categories and tags are combined without
+    duplicates.
+    """
+    titles = {_text(parts[0]['post_title'])}
+    first_heading = _LEADING_HEADING.match(parts[0]['post_content'])
+    if first_heading:
+        titles.add(_text(first_heading.group(2)))
+    content = [parts[0]['post_content']]
+    for part in parts[1:]:
+        section = part['post_content']
+        heading = _LEADING_HEADING.match(section)
+        if heading and _text(heading.group(2)) in titles | {_text(part['post_title'])}:
+            section = section[heading.end():]
+        content.append(_H2.sub(r"<\1h3\2>", section))
+    return {
+        'post_title': parts[0]['post_title'],
+        'post_content': "\n".join(content),
+        'post_excerpt': parts[0]['post_excerpt'],
+        'post_category': _merge_list(part['post_category'] for part in parts),
+        'tags_input': _merge_list(part['tags_input'] for part in parts),
+    }
+
+
+def parse_response(content):
+    """Read the post fields from the JSON answer.
+
+    Code fences are ignored and an answer cut off mid-way keeps the fields it
+    completed. Raises ValueError (json.JSONDecodeError) if no post content
+    can be recovered.
+    """
+    response_dict = parse_json_lenient(content)
+    values = {column: response_dict.get(column) or '' for column in OUTPUT_COLUMNS}
+    if not str(values['post_content']).strip():
+        raise ValueError("the answer has no post_content")
+    return values
+
+
+# The guideline of each field, as given in the system message
+FIELD_RULES = dict(re.findall(r"^- (\w+): (.*)$", SYSTEM_MESSAGE, re.MULTILINE))
+
+_BANNED_TITLE_WORDS = re.compile(r"\b(discover\w*|gems?|explor\w*)\b", re.IGNORECASE)
+_PARAGRAPH = re.compile(r"<p\b[^>]*>(.*?)</p>", re.IGNORECASE | re.DOTALL)
+_BOLD = re.compile(r"<(strong|b)\b", re.IGNORECASE)
+
+
+def autofix(values):
+    """Apply the fixes that don't need the model: lists joined, emojis and links removed, tags closed."""
+    fixed = {}
+    for column in OUTPUT_COLUMNS:
+        value = values.get(column) or ''
+        if isinstance(value, list):
+            value = ", ".join(str(item) for item in value)
+        fixed[column] = remove_emojis(str(value)).strip()
+    fixed['post_content'] = close_open_tags(remove_links(fixed['post_content']))
+    return fixed
+
+
+def validate(values):
+    """Check a post against the system message's guidelines.
+
+    Returns {column: [problems]} for the fields that break a rule, or {} if the
+    post is fine.
+    """
+    problems = {}
+    for column in OUTPUT_COLUMNS:
+        value = values.get(column) or ''
+        issues = []
+        if not value.strip():
+            issues.append("the field is empty")
+        elif has_emojis(value):
+            issues.append("it contains emojis")
+        problems[column] = issues
+
+    title = values.get('post_title') or ''
+    problems['post_title'].extend(f"it uses the word '{word}'" for word in _BANNED_TITLE_WORDS.findall(title))
+
+    content = values.get('post_content') or ''
+    if content.strip():
+        headings = len(re.findall(r"<h2\b", content, re.IGNORECASE))
+        if headings != 1:
+            problems['post_content'].append(f"it has {headings} <h2> headings instead of exactly one")
+        unbolded = [p for p in _PARAGRAPH.findall(content) if p.strip() and not _BOLD.search(p)]
+        if unbolded:
+            problems['post_content'].append(
+                f"{len(unbolded)} paragraph{'s' if len(unbolded) > 1 else ''} without a bold (<strong>) word")
+        if has_links(content):
+            problems['post_content'].append("it contains links")
+        problems['post_content'].extend(check_html(content))
+    return {column: issues for column, issues in problems.items() if issues}
+
+
+def repair_messages(column, values, problems):
+    """A short request asking the model to rewrite only the field that breaks the rules."""
+    listed = "\n".join(f"- {problem}" for problem in problems)
+    system = (
+        "You are an editor for a WordPress website focused on Japan and tourism in Japan. "
+        f"Rewrite the {column} field of a post so that it follows this guideline:\n"
+        f"- {column}: {FIELD_RULES[column]}\n"
+        "Keep the meaning and the facts; change only what the guideline requires. "
+        'Answer in JSON as {"value": "<the corrected field>"}.'
+    )
+    context = {key: values[key] for key in ('post_title', 'post_content') if key != column}
+    user = (
+        f"Problems with {column}:\n{listed}\n\n"
+        f"Current {column}:\n{values[column]}\n\n"
+        f"Rest of the post:\n{json.dumps(context, ensure_ascii=False)}"
+    )
+    return [
+        {"role": "system", "content": [{"type": "text", "text": system}]},
+        {"role": "user", "content": [{"type": "text", "text": user}]},
+    ]
+
+
+def parse_repair(column, content):
+    """The corrected field from a repair answer; raises ValueError if there is none."""
+    value = parse_json_lenient(content).get("value")
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"the repair of {column} has no value")
+    return value
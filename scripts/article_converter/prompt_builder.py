@@ -0,0 +1,295 @@
+"""Token-aware prompt building: few-shot selection, section splitting and a savings report.
+
+Every request starts with the same static prefix (system message, then the
+examples in a fixed order), byte for byte, so Azure's prompt caching can reuse
+it across rows. When a token budget is set, examples are dropped from the end
+of the list for long articles; the requests that keep more examples still
+share the longest possible prefix with the others. Articles too long to be
+converted within `max_tokens` are split into sections at their headings and
+paragraphs. The first is sent as the article, the others as its continuation;
+the profile merges the answers back into one.
+"""
+import math
+import os
+import re
+
+# Azure only caches prompts whose identical prefix is at least this long
+PROMPT_CACHE_MIN_TOKENS = 1024
+# Default size of an article section. The HTML answer runs about 1.4x the
+# article plus the <head>, so 2000 tokens stays clear of max_tokens=3000.
+DEFAULT_SECTION_TOKENS = 2000
+
+# Tokens added per message by the chat format, on top of its text
+_MESSAGE_OVERHEAD = 4
+_REPLY_OVERHEAD = 3
+
+# First line of the sections after the first: they are converted as the rest
+# of the same article, so the title the model echoes carries no part marker
+CONTINUATION = (
+    'Continuation of the article "{title}". Convert only the text below, as the rest of the same '
+    "article: don't repeat the title and don't add a links section."
+)
+
+_HEADING = re.compile(r"^(#{1,6}\s|<h[1-6][\s>])", re.IGNORECASE)
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken, or estimates them (4 characters per token) if it isn't available."""
+
+    def __init__(self, model):
+        self.exact = False
+        self._encoding = None
+        try:
+            import tiktoken
+
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                # Azure deployment names are not always model names; gpt-4o uses o200k_base
+                self._encoding = tiktoken.get_encoding("o200k_base")
+            self.exact = True
+        except Exception as e:
+            print(f"Token counts are estimated, tiktoken could not be loaded ({type(e).__name__})")
+
+    def count(self, text):
+        if self._encoding is None:
+            return len(text) // 4 + 1
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def count_message(self, message):
+        content = message["content"]
+        if not isinstance(content, str):
+            content = "".join(part.get("text", "") for part in content)
+        return self.count(content) + _MESSAGE_OVERHEAD
+
+    def count_messages(self, messages):
+        return sum(self.count_message(message) for message in messages) + _REPLY_OVERHEAD
+
+
+def _user_message(text):
+    return {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": text}
+        ]
+    }
+
+
+def split_sections(text, limit, counter):
+    """Split an article into pieces of at most about `limit` tokens.
+
+    The article is cut into as few pieces as the limit allows, of about equal
+    size: each cut goes before the heading nearest its target size, or at the
+    paragraph break nearest it when no heading keeps the number of pieces
+    down. A paragraph is only cut inside (at line ends) when it is too long
+    alone.
+    """
+    blocks = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        if not paragraph.strip():
+            continue
+        if counter.count(paragraph) <= limit:
+            blocks.append(paragraph)
+            continue
+        piece = []
+        for line in paragraph.splitlines():
+            if piece and counter.count("\n".join(piece + [line])) > limit:
+                blocks.append("\n".join(piece))
+                piece = []
+            piece.append(line)
+        if piece:
+            blocks.append("\n".join(piece))
+
+    sizes = [counter.count(block) + 1 for block in blocks]
+    # needed[i] = fewest pieces blocks[i:] fit in (filling each piece up to the limit)
+    needed = [0] * (len(blocks) + 1)
+    for i in range(len(blocks) - 1, -1, -1):
+        end, tokens = i + 1, sizes[i]
+        while end < len(blocks) and tokens + sizes[end] <= limit:
+            tokens += sizes[end]
+            end += 1
+        needed[i] = needed[end] + 1
+
+    sections = []
+    start = 0
+    while start < len(blocks):
+        target = sum(sizes[start:]) / needed[start]
+        # Among the cuts that keep the piece within the limit and don't add a
+        # piece, take the heading nearest the target size, else the nearest break
+        best = best_heading = None
+        end, tokens = start + 1, sizes[start]
+        while True:
+            if needed[end] < needed[start]:
+                distance = abs(tokens - target)
+                if best is None or distance < best[0]:
+                    best = (distance, end)
+                if end < len(blocks) and _HEADING.match(blocks[end].lstrip()) \
+                        and (best_heading is None or distance < best_heading[0]):
+                    best_heading = (distance, end)
+            if end == len(blocks) or tokens + sizes[end] > limit:
+                break
+            tokens += sizes[end]
+            end += 1
+        end = (best_heading or best)[1]
+        sections.append("\n\n".join(blocks[start:end]))
+        start = end
+    return sections or [text]
+
+
+class PromptBuilder:
+    """Builds the requests for one article and keeps count of the prompt tokens they use.
+
+    `prompt_budget` caps the input tokens of a request (0 = no cap): examples
+    are dropped from the end until the request fits, keeping at least
+    `min_examples`. `section_tokens` is the longest article sent in one request
+    (0 = never split).
+    """
+
+    def __init__(self, profile, model, prompt_budget=0, section_tokens=DEFAULT_SECTION_TOKENS,
+                 min_examples=1, counter=None):
+        self.profile = profile
+        self.prompt_budget = prompt_budget or 0
+        self.section_tokens = section_tokens or 0
+        self.min_examples = min_examples
+        self.counter = counter or TokenCounter(model)
+
+        chat_prompt = profile.CHAT_PROMPT
+        examples = profile.EXAMPLE_MESSAGES
+        self.head = chat_prompt[:examples.start]
+        self.examples = [chat_prompt[i:i + 2] for i in range(examples.start, examples.stop, 2)]
+        self.tail = chat_prompt[examples.stop:]
+        self.min_examples = min(self.min_examples, len(self.examples))
+
+        # prefix_tokens[k] = tokens of the static part when the first k examples are kept
+        head_tokens = sum(self.counter.count_message(m) for m in self.head)
+        tail_tokens = sum(self.counter.count_message(m) for m in self.tail)
+        self.prefix_tokens = [head_tokens + tail_tokens]
+        for pair in self.examples:
+            self.prefix_tokens.append(self.prefix_tokens[-1] + sum(self.counter.count_message(m) for m in pair))
+        self.full_prefix_tokens = self.prefix_tokens[-1]
+
+        self.requests = 0
+        self.articles = 0
+        self.split_articles = 0
+        self.rebuilt_articles = 0
+        self.tokens_built = 0
+        self.cached_requests = 0
+        self.tokens_from_cache = 0
+        self.tokens_full_prompt = 0
+        self.examples_dropped = 0
+
+    def _messages(self, examples_kept, text):
+        messages = list(self.head)
+        for pair in self.examples[:examples_kept]:
+            messages.extend(pair)
+        messages.extend(self.tail)
+        messages.append(_user_message(text))
+        return messages
+
+    def _examples_that_fit(self, article_tokens):
+        if not self.prompt_budget:
+            return len(self.examples)
+        for kept in range(len(self.examples), self.min_examples, -1):
+            if self.prefix_tokens[kept] + article_tokens + _REPLY_OVERHEAD <= self.prompt_budget:
+                return kept
+        return self.min_examples
+
+    def _section_limit(self):
+        limit = self.section_tokens
+        if self.prompt_budget:
+            room = self.prompt_budget - self.prefix_tokens[self.min_examples] - _REPLY_OVERHEAD - _MESSAGE_OVERHEAD
+            limit = min(limit, room) if limit else room
+        return max(limit, 1) if limit else 0
+
+    def build(self, title, text):
+        """Return the list of requests (message lists) for one article, one per section."""
+        title = str(title)
+        text = str(text)
+        whole_tokens = self.counter.count(f"{title}\n\n{text}") + _MESSAGE_OVERHEAD
+        self.articles += 1
+        self.tokens_full_prompt += self.full_prefix_tokens + whole_tokens + _REPLY_OVERHEAD
+
+        limit = self._section_limit()
+        requests = self._requests(title, text, limit if limit and whole_tokens > limit else 0)
+        if len(requests) > 1:
+            self.split_articles += 1
+        return requests
+
+    def rebuild(self, title, text, sections):
+        """The requests for an article again, split into about `sections` sections.
+
+        For an article whose answer was cut off at max_tokens. Its new requests
+        are counted; the article itself isn't counted twice.
+        """
+        text = str(text)
+        self.rebuilt_articles += 1
+        limit = max(1, math.ceil(self.counter.count(text) / sections))
+        return self._requests(str(title), text, limit)
+
+    def _requests(self, title, text, limit):
+        sections = split_sections(text, limit, self.counter) if limit else [text]
+        articles = [f"{title}\n\n{sections[0]}"]
+        articles.extend(f"{CONTINUATION.format(title=title)}\n\n{section}" for section in sections[1:])
+
+        requests = []
+        for article in articles:
+            article_tokens = self.counter.count(article) + _MESSAGE_OVERHEAD
+            kept = self._examples_that_fit(article_tokens)
+            self.examples_dropped += len(self.examples) - kept
+            self.requests += 1
+            self.tokens_built += self.prefix_tokens[kept] + article_tokens + _REPLY_OVERHEAD
+            requests.append(self._messages(kept, article))
+        return requests
+
+    def served_from_cache(self, messages):
+        """Count a built request that the completion cache answered, so it wasn't sent."""
+        self.cached_requests += 1
+        self.tokens_from_cache += self.counter.count_messages(messages)
+
+    def report(self):
+        saved = self.tokens_full_prompt - self.tokens_built
+        return {
+            "exact_counts": self.counter.exact,
+            "articles": self.articles,
+            "requests": self.requests - self.cached_requests,
+            "cached_requests": self.cached_requests,
+            "split_articles": self.split_articles,
+            "rebuilt_articles": self.rebuilt_articles,
+            "examples_dropped": self.examples_dropped,
+            "static_prefix_tokens": self.full_prefix_tokens,
+            "prefix_cacheable": self.prefix_tokens[self.min_examples] >= PROMPT_CACHE_MIN_TOKENS,
+            "input_tokens_sent": self.tokens_built - self.tokens_from_cache,
+            "input_tokens_from_cache": self.tokens_from_cache,
+            "input_tokens_full_prompt": self.tokens_full_prompt,
+            "input_tokens_saved": saved,
+        }
+
+    def print_report(self, cached_tokens=None):
+        report = self.report()
+        if not report["requests"] and not report["cached_requests"]:
+            return
+        estimated = "" if report["exact_counts"] else " (estimated)"
+        full = report["input_tokens_full_prompt"]
+        share = report["input_tokens_saved"] / full if full else 0
+        print(f"\nPrompt tokens{estimated}: {report['input_tokens_sent']:,} sent in {report['requests']:,} requests "
+              f"for {report['articles']:,} articles")
+        if report["cached_requests"]:
+            print(f"  answered by the completion cache instead: {report['input_tokens_from_cache']:,} tokens "
+                  f"in {report['cached_requests']:,} requests")
+        print(f"  all requests with the full few-shot prompt: {full:,} "
+              f"(saved {report['input_tokens_saved']:,}, {share:.0%})")
+        print(f"  examples dropped: {report['examples_dropped']:,}, articles split into sections: "
+              f"{report['split_articles']:,}")
+        if report["rebuilt_articles"]:
+            print(f"  sent again in smaller sections after being cut off: {report['rebuilt_articles']:,} times")
+        print(f"  static prefix: {report['static_prefix_tokens']:,} tokens, "
+              f"{'eligible' if report['prefix_cacheable'] else 'too short'} for Azure prompt caching")
+        if cached_tokens is not None:
+            print(f"  prompt tokens served from Azure's prompt cache: {cached_tokens:,}")
+
+
+def prompt_settings_from_env():
+    return {
+        "prompt_budget": int(os.getenv("PROMPT_TOKEN_BUDGET", "0")),
+        "section_tokens": int(os.getenv("SECTION_TOKEN_LIMIT", str(DEFAULT_SECTION_TOKENS))),
+    }
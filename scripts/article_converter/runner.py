@@ -0,0 +1,315 @@
+"""Concurrent chat completions within the deployment's rate limits."""
+import copy
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .cache import CachedCompletion, request_key
+from .metrics import RequestRecord
+
+# Status codes worth retrying: rate limits, timeouts/conflicts and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# Azure also enforces the quota over 10-second windows (RPM/6, TPM/6), so the
+# buckets hold at most that much and a run ramps up instead of bursting.
+BURST_SECONDS = 10
+
+
+class RateLimiter:
+    """Token buckets for the deployment's requests-per-minute and tokens-per-minute quota.
+
+    A limit of 0 disables that bucket. Both buckets refill continuously, the way
+    Azure OpenAI enforces its quota, so work is spread over the minute instead
+    of being sent in one burst. They start with and hold at most
+    BURST_SECONDS worth of quota.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests_per_minute = requests_per_minute or 0
+        self.tokens_per_minute = tokens_per_minute or 0
+        self.request_capacity = max(1.0, self.requests_per_minute * BURST_SECONDS / 60.0)
+        self.token_capacity = self.tokens_per_minute * BURST_SECONDS / 60.0
+        self._lock = threading.Lock()
+        self._request_allowance = self.request_capacity if self.requests_per_minute else 0.0
+        self._token_allowance = self.token_capacity
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                self.request_capacity,
+                self._request_allowance + elapsed * self.requests_per_minute / 60.0,
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                self.token_capacity,
+                self._token_allowance + elapsed * self.tokens_per_minute / 60.0,
+            )
+
+    def acquire(self, tokens=0):
+        """Block until one request costing `tokens` fits in both budgets."""
+        if self.tokens_per_minute:
+            # A single request can never need more than the bucket holds
+            tokens = min(tokens, self.token_capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    missing_requests = 1 - self._request_allowance if self.requests_per_minute else 0
+                    missing_tokens = tokens - self._token_allowance if self.tokens_per_minute else 0
+                    if missing_requests <= 0 and missing_tokens <= 0:
+                        if self.requests_per_minute:
+                            self._request_allowance -= 1
+                        if self.tokens_per_minute:
+                            self._token_allowance -= tokens
+                        return
+                    wait = max(
+                        missing_requests * 60.0 / self.requests_per_minute if missing_requests > 0 else 0,
+                        missing_tokens * 60.0 / self.tokens_per_minute if missing_tokens > 0 else 0,
+                    )
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out capacity for `seconds`, e.g. after the server answered 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def estimate_tokens(messages, max_tokens=0):
+    """Rough token count for a request, as Azure estimates it for the TPM quota.
+
+    Azure counts the prompt plus `max_tokens` against the quota when the request
+    arrives, so both are included. Four characters per token is close enough
+    for scheduling.
+    """
+    characters = 0
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            characters += len(content)
+        else:
+            characters += sum(len(part.get("text", "")) for part in content)
+    return characters // 4 + len(messages) * 4 + (max_tokens or 0)
+
+
+class StreamedCompletion(CachedCompletion):
+    """A streamed answer put back together: its text, finish reason and usage."""
+
+    cached = False
+
+    def __init__(self, content, finish_reason, usage):
+        super().__init__(content, finish_reason)
+        self.usage = usage
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def retry_after_seconds(error):
+    """Read the server's Retry-After hint (in seconds) from an API error, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                pass
+    return None
+
+
+def is_retryable(error):
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    # Connection problems and timeouts carry no status code
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class ChatRunner:
+    """Runs chat completions for many rows at once within the deployment's quota.
+
+    Requests go through a thread pool of `max_workers` threads. Each request
+    first reserves its estimated tokens from the shared RateLimiter. Retryable
+    errors back off with jitter, and 429 answers honour Retry-After and pause
+    every worker. Results are handed back with the row index they belong to,
+    so they can be written into the right row whatever order they finish in.
+
+    With a CompletionCache, requests that were answered before are served
+    from disk without touching the quota. With a MetricsRecorder, every
+    request is timed and its token usage recorded; when `request_params` has
+    stream=True the answer is streamed so the time to first token is known.
+    """
+
+    def __init__(self, client, model, request_params, max_workers=4,
+                 requests_per_minute=0, tokens_per_minute=0,
+                 max_retries=6, base_delay=1.0, max_delay=60.0, cache=None,
+                 metrics=None, kind="convert"):
+        self.client = client
+        self.model = model
+        self.request_params = dict(request_params)
+        self.max_workers = max(1, max_workers)
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.cache = cache
+        self.metrics = metrics
+        self.kind = kind
+
+    @classmethod
+    def from_env(cls, client, model, request_params, cache=None, metrics=None, **overrides):
+        """Build a runner configured by MAX_CONCURRENCY, RATE_LIMIT_RPM and RATE_LIMIT_TPM.
+
+        Keyword overrides that are not None win over the environment.
+        """
+        settings = dict(
+            max_workers=int(os.getenv("MAX_CONCURRENCY", "4")),
+            requests_per_minute=int(os.getenv("RATE_LIMIT_RPM", "0")),
+            tokens_per_minute=int(os.getenv("RATE_LIMIT_TPM", "0")),
+            max_retries=int(os.getenv("MAX_RETRIES", "6")),
+        )
+        settings.update((key, value) for key, value in overrides.items() if value is not None)
+        return cls(client, model, request_params, cache=cache, metrics=metrics, **settings)
+
+    def with_params(self, request_params, kind=None):
+        """A runner sending other request parameters that shares this one's quota, workers and cache."""
+        runner = copy.copy(self)
+        runner.request_params = dict(request_params)
+        if kind is not None:
+            runner.kind = kind
+        return runner
+
+    def _backoff(self, attempt, error):
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        # Jitter so the workers that were throttled together don't retry together
+        return delay + random.uniform(0, max(delay, self.base_delay) * 0.5)
+
+    def complete(self, messages, key=None, submitted=None):
+        """Send one chat completion request, retrying until it succeeds or gives up.
+
+        `submitted` is the perf_counter() time the job was handed to the thread
+        pool; the wait for a free worker then counts as queueing too.
+        """
+        record = RequestRecord.for_key(key, self.kind, self.model)
+        start = time.perf_counter()
+        if submitted is not None:
+            record.queue_seconds = start - submitted
+            record.started_at -= record.queue_seconds
+            start = submitted
+        try:
+            completion = self._complete(messages, record)
+            record.read_completion(completion)
+            return completion
+        except Exception as e:
+            record.status = "error"
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.wall_seconds = time.perf_counter() - start
+            if self.metrics is not None:
+                self.metrics.record(record)
+
+    def _complete(self, messages, record):
+        if self.cache is not None:
+            cached = self.cache.get(request_key(self.model, messages, self.request_params))
+            if cached is not None:
+                return cached
+        tokens = estimate_tokens(messages, self.request_params.get("max_tokens"))
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            self.limiter.acquire(tokens)
+            sent = time.perf_counter()
+            record.queue_seconds += sent - queued
+            try:
+                if self.request_params.get("stream"):
+                    completion = self._stream(messages, sent, record)
+                else:
+                    completion = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        **self.request_params
+                    )
+                record.latency_seconds = time.perf_counter() - sent
+                return completion
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self._backoff(attempt, e)
+                if _status_code(e) == 429:
+                    self.limiter.pause(delay)
+                print(f"Request failed ({type(e).__name__}), retrying in {delay:.1f}s...")
+                time.sleep(delay)
+                attempt += 1
+                record.retries = attempt
+
+    def _stream(self, messages, sent, record):
+        # The last chunk carries the usage when include_usage is set
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream_options={"include_usage": True},
+            **self.request_params
+        )
+        record.ttft_seconds = None
+        parts = []
+        finish_reason = None
+        usage = None
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                usage = chunk.usage
+            # Azure also sends chunks without choices, e.g. for content filter results
+            for choice in chunk.choices:
+                if choice.delta is not None and choice.delta.content:
+                    if record.ttft_seconds is None:
+                        record.ttft_seconds = time.perf_counter() - sent
+                    parts.append(choice.delta.content)
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+        return StreamedCompletion("".join(parts), finish_reason, usage)
+
+    def run(self, jobs, on_success, on_error=None):
+        """Complete every (index, messages) job concurrently.
+
+        `on_success(index, completion)` and `on_error(index, exception)` are
+        called from the calling thread as each job finishes, so they can write
+        to a DataFrame without extra locking. `on_success` may return False to
+        reject a completion (e.g. unparsable JSON) so it is not cached.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.complete, messages, index, time.perf_counter()): (index, messages)
+                for index, messages in jobs
+            }
+            try:
+                for future in as_completed(futures):
+                    index, messages = futures[future]
+                    try:
+                        completion = future.result()
+                    except Exception as e:
+                        if on_error is None:
+                            raise
+                        on_error(index, e)
+                    else:
+                        accepted = on_success(index, completion)
+                        if self.cache is not None and accepted is not False \
+                                and not getattr(completion, "cached", False):
+                            self.cache.put(request_key(self.model, messages, self.request_params), completion)
+            except KeyboardInterrupt:
+                # Drop the rows that haven't started so Ctrl-C returns quickly
+                for future in futures:
+                    future.cancel()
+                raise
@@ -0,0 +1,119 @@
+"""Synthetic article sheets for benchmarks and for trying the converter without real exports.
+
+The articles look like the real ones: a place name as title, a Markdown text
+with headings, bold words, emojis and a Google Maps link. The same seed always
+gives the same sheet. Besides .xlsx and plain CSV, the CSV variants reproduce
+the exports the fallback parsers in spreadsheet.py exist for:
+
+    csv           quoted where needed, "" inside quotes, newlines inside fields
+    csv-escaped   every field quoted, quotes escaped as \\" (as ResultWriter writes them)
+    csv-tab       tab separated, nothing quoted, quotes left bare in the text
+    csv-unquoted  comma separated, nothing quoted, commas and quotes escaped with a backslash
+
+    python -m article_converter.sample_sheets --rows 10000 --format csv-escaped articles.csv
+"""
+import argparse
+import csv
+import random
+
+FORMATS = ("xlsx", "csv", "csv-escaped", "csv-tab", "csv-unquoted")
+
+PLACES = [
+    "Nakameguro", "Yanaka Ginza", "Omoide Yokocho", "Fushimi Inari", "Arashiyama", "Dotonbori",
+    "Kenrokuen", "Nara Park", "Shirakawa-go", "Hakone", "Kamakura", "Nikko", "Takayama",
+    "Miyajima", "Naoshima", "Koyasan", "Kinosaki Onsen", "Matsumoto Castle", "Otaru Canal",
+    "Kurashiki", "Tsukiji Outer Market", "Shimokitazawa", "Gion", "Nishiki Market",
+]
+TOPICS = [
+    "Cherry Blossom", "Local Food", "History", "Getting There", "Shopping", "Festivals",
+    "Where to Stay", "Hidden Corners", "Seasonal Events", "Etiquette",
+]
+WORDS = (
+    "the area is known for its narrow streets and small shops selling local crafts while visitors "
+    "come for the temples gardens and seasonal views that change through the year many restaurants "
+    "serve regional dishes such as grilled fish noodles and sweets made by hand the station is a short "
+    "walk away and trains run often from the city centre evenings are quieter when the day trippers "
+    "have left and the lanterns light up the old wooden houses along the river"
+).split()
+EMOJIS = ["🌸", "🏯", "🍜", "🚉", "✨", "🍵", "⛩️"]
+
+
+def _paragraph(rng, words):
+    text = [rng.choice(WORDS) for _ in range(words)]
+    for _ in range(max(1, words // 25)):
+        position = rng.randrange(len(text))
+        text[position] = f"**{text[position]}**"
+    if rng.random() < 0.2:
+        # Quotes inside the text are what breaks naive CSV parsing
+        text.insert(rng.randrange(len(text)), '"kawaii"')
+    text[0] = text[0].capitalize()
+    return " ".join(text) + "."
+
+
+def make_article(rng, number, paragraphs=(3, 8), words=(40, 90)):
+    """One (title, text) pair; the text is Markdown with newlines, emojis and a link."""
+    place = rng.choice(PLACES)
+    title = f"{place} {number}"
+    lines = [f"# A Guide to {place} {rng.choice(EMOJIS)}", "",
+             f"[**Location on Google Maps**](https://maps.app.goo.gl/{number:08x})", ""]
+    for _ in range(rng.randint(*paragraphs)):
+        if rng.random() < 0.5:
+            lines.extend([f"## **{rng.choice(TOPICS)}** {rng.choice(EMOJIS)}", ""])
+        lines.extend([_paragraph(rng, rng.randint(*words)), ""])
+    return title, "\n".join(lines).strip()
+
+
+def articles(rows, seed=0):
+    rng = random.Random(seed)
+    for number in range(1, rows + 1):
+        yield make_article(rng, number)
+
+
+def write_sheet(path, rows, sheet_format=None, seed=0):
+    """Write `rows` synthetic articles to `path`; the format defaults to the file extension."""
+    sheet_format = sheet_format or ("xlsx" if path.endswith(".xlsx") else "csv")
+    if sheet_format not in FORMATS:
+        raise ValueError(f"Unknown format '{sheet_format}', expected one of: {', '.join(FORMATS)}")
+    if sheet_format == "xlsx":
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(["Title", "Text"])
+        for title, text in articles(rows, seed):
+            sheet.append([title, text])
+        workbook.save(path)
+        return path
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if sheet_format == "csv":
+            writer = csv.writer(f)
+        elif sheet_format == "csv-escaped":
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL, doublequote=False, escapechar="\\")
+        elif sheet_format == "csv-tab":
+            writer = csv.writer(f, delimiter="\t", quoting=csv.QUOTE_NONE, escapechar="\\")
+        else:
+            writer = csv.writer(f, quoting=csv.QUOTE_NONE, escapechar="\\")
+        writer.writerow(["Title", "Text"])
+        for title, text in articles(rows, seed):
+            if sheet_format == "csv-tab":
+                # A tab-separated export keeps one article per line
+                text = text.replace("\t", " ").replace("\n", " ")
+            writer.writerow([title, text])
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a sheet of synthetic Japan travel articles")
+    parser.add_argument("output", help="file to write (.xlsx or .csv)")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    write_sheet(args.output, args.rows, args.format, args.seed)
+    print(f"Wrote {args.rows} articles to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
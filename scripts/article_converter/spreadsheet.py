@@ -0,0 +1,193 @@
+"""Reading article sheets in chunks and writing the converted results as they are ready.
+
+Archive exports can be hundreds of MB of article text, so neither the input
+nor the output is ever held in memory as a whole: peak memory is bounded by
+the chunk size, not by the size of the file.
+"""
+import csv
+import os
+
+DEFAULT_CHUNK_SIZE = 500
+SNIFF_BYTES = 64 * 1024
+
+
+class InputFileError(Exception):
+    """The input sheet could not be read."""
+
+
+def read_chunks(input_file, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the sheet as DataFrames of at most `chunk_size` rows.
+
+    Row labels keep counting across chunks (0, 1, 2, ... over the whole
+    file), so they identify a row the same way a full read would.
+    """
+    if input_file.endswith('.xlsx'):
+        chunks = _read_xlsx_chunks(input_file, chunk_size)
+    elif input_file.endswith('.xls'):
+        chunks = _read_xls_chunks(input_file, chunk_size)
+    else:
+        chunks = _read_csv_chunks(input_file, chunk_size)
+
+    print(f"Reading file: {input_file}")
+    rows = 0
+    try:
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+    except InputFileError:
+        raise
+    except Exception as e:
+        raise InputFileError(f"Error reading file: {str(e)}") from e
+    print(f"Finished reading {rows} rows from {input_file}")
+
+
+def _read_xlsx_chunks(input_file, chunk_size):
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    # Read-only mode streams rows from the zip instead of loading the whole workbook
+    workbook = load_workbook(input_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        start = 0
+        batch = []
+        for values in rows:
+            if all(value is None for value in values):
+                continue
+            batch.append(values)
+            if len(batch) == chunk_size:
+                yield pd.DataFrame(batch, columns=columns, index=range(start, start + len(batch)))
+                start += len(batch)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, index=range(start, start + len(batch)))
+    finally:
+        workbook.close()
+
+
+def _read_xls_chunks(input_file, chunk_size):
+    import pandas as pd
+
+    # The old binary format can't be streamed; read it once and hand it out in chunks
+    df = pd.read_excel(input_file)
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def sniff_csv_options(input_file):
+    """Guess delimiter and quoting from the start of the file, once, for the fast C parser."""
+    with open(input_file, encoding='utf-8', newline='') as f:
+        sample = f.read(SNIFF_BYTES)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',\t;')
+    except csv.Error:
+        return None
+    # The sniffer's guess for doublequote is unreliable, and the first \" may come
+    # after the sample; the C parser accepts "" and \" together, so allow both
+    return dict(sep=dialect.delimiter, quotechar=dialect.quotechar or '"', doublequote=True, escapechar='\\')
+
+
+def _csv_attempts(input_file):
+    """Ways of parsing a CSV export, tried in order until one gives Title and Text columns."""
+    sniffed = sniff_csv_options(input_file)
+    if sniffed:
+        yield "detected format", dict(engine='c', **sniffed)
+    # The formats the exports have come in so far, parsed by the slower python engine
+    yield "quoted", dict(quoting=1, escapechar='\\', quotechar='"', engine='python')
+    yield "tab separated", dict(sep='\t', engine='python')
+    yield "unquoted", dict(sep=',', quoting=3, escapechar='\\', engine='python')
+
+
+def _read_csv_chunks(input_file, chunk_size):
+    import pandas as pd
+
+    errors = []
+    for name, options in _csv_attempts(input_file):
+        try:
+            reader = pd.read_csv(input_file, encoding='utf-8', chunksize=chunk_size, **options)
+            first = next(reader, None)
+        except Exception as e:
+            errors.append(f"{name}: {str(e)}")
+            print(f"Reading as {name} failed, trying alternative method...")
+            continue
+        if first is not None and not {'Title', 'Text'} <= set(first.columns):
+            errors.append(f"{name}: no Title and Text columns")
+            print(f"Reading as {name} found no Title and Text columns, trying alternative method...")
+            continue
+        if first is not None:
+            yield first
+            yield from reader
+        return
+    raise InputFileError("Error reading file: " + "; ".join(errors))
+
+
+class ResultWriter:
+    """Writes chunks to .xlsx (openpyxl write-only mode) or CSV (appending) as they arrive.
+
+    The chunks go to a temporary file next to `output_file`, which only
+    replaces it on close(). Until then the existing file is left alone, so the
+    output may be the input sheet itself, and a run that fails half-way
+    (discard()) leaves no half-written output behind.
+    """
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.rows = 0
+        self._columns = None
+        self._workbook = None
+        self._sheet = None
+        directory, name = os.path.split(os.path.abspath(output_file))
+        self._partial_file = os.path.join(directory, f".{name}.partial{os.path.splitext(name)[1]}")
+        if os.path.exists(self._partial_file):
+            # Left behind by a run that was killed
+            os.remove(self._partial_file)
+        if output_file.endswith('.xlsx'):
+            from openpyxl import Workbook
+
+            self._workbook = Workbook(write_only=True)
+            self._sheet = self._workbook.create_sheet()
+
+    def write(self, chunk):
+        if self._columns is None:
+            self._columns = list(chunk.columns)
+            if self._sheet is not None:
+                self._sheet.append(self._columns)
+        chunk = chunk.reindex(columns=self._columns)
+        if self._sheet is not None:
+            import pandas as pd
+
+            for values in chunk.itertuples(index=False, name=None):
+                # Empty cells come out of pandas as NaN; openpyxl wants None
+                self._sheet.append([None if pd.isna(value) else value for value in values])
+        else:
+            chunk.to_csv(self._partial_file, mode='a', header=self.rows == 0, index=False,
+                         quoting=1, escapechar='\\')
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.save(self._partial_file)
+        elif not self.rows:
+            open(self._partial_file, 'w').close()
+        os.replace(self._partial_file, self.output_file)
+        self._partial_file = None
+        print(f"\nProcessing complete! File saved as: {self.output_file}")
+
+    def discard(self):
+        """Drop what was written so far; `output_file` stays as it was."""
+        if self._partial_file is not None and os.path.exists(self._partial_file):
+            os.remove(self._partial_file)
+        self._partial_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
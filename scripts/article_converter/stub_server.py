@@ -0,0 +1,442 @@
+"""Local stand-in for the Azure OpenAI chat completions, files and batches endpoints.
+
+Chat completions answer with random latency and are randomly throttled with
+429 + Retry-After, so the concurrent runner can be exercised without spending
+quota. Requests with stream=True are answered as server-sent events, the
+first token arriving after a fifth of the latency.
+
+Answers are deterministic: the article of the request turned into an HTML
+page or a WordPress post, so their size follows the input. Latency can be
+drawn from a uniform or lognormal distribution, plus generation time per
+token; --rpm/--tpm enforce a per-minute quota the way Azure does, and
+--error-probability injects 500 errors. With --seed, runs are repeatable.
+Uploaded batch files are "processed" in memory and move through the usual
+statuses until they complete after --batch-duration seconds:
+
+    python -m article_converter.stub_server --port 8000 --rate-limit-probability 0.2
+    ENDPOINT_URL=http://127.0.0.1:8000/ AZURE_OPENAI_API_KEY=stub python -m article_converter html articles.csv -o out.xlsx
+    ENDPOINT_URL=http://127.0.0.1:8000/ AZURE_OPENAI_API_KEY=stub python -m article_converter html articles.csv -o out.xlsx --batch
+"""
+import argparse
+import html
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HTML_REPLY = "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n  <title>Stub article</title>\n</head>\n<body>\n  <h1>Stub article</h1>\n  <p>Converted by the stub server.</p>\n</body>\n</html>"
+
+
+_CONTINUED = re.compile(r'^Continuation of the article "(.*)"\.')
+
+
+def _prompt_text(body):
+    parts = []
+    for message in body.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(part.get("text", "") for part in content)
+    return "".join(parts)
+
+
+def _article(body):
+    # The article is the text of the last user message: its title, a blank line, the text
+    for message in reversed(body.get("messages", [])):
+        if message.get("role") == "user":
+            content = message.get("content", "")
+            if not isinstance(content, str):
+                content = "".join(part.get("text", "") for part in content)
+            title, _, text = content.partition("\n\n")
+            # Later sections of a long article name it in a continuation line; the
+            # stub echoes that title, as the model tends to, and merging drops it
+            continued = _CONTINUED.match(title)
+            if continued:
+                title = continued.group(1)
+            paragraphs = [html.escape(" ".join(p.split())) for p in text.split("\n\n") if p.strip()]
+            return html.escape(title.strip()), paragraphs
+    return "Stub article", []
+
+
+def _reply(body):
+    schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("name")
+    if schema == "repaired_field":
+        return json.dumps({"value": "Stub repair"})
+    title, paragraphs = _article(body)
+    if "post_title" in _prompt_text(body):
+        content = [f"<h2>{title}</h2>"] + [f"<p><strong>{title}</strong>: {p}</p>" for p in paragraphs]
+        return json.dumps({
+            "post_title": title,
+            "post_content": "\n".join(content),
+            "post_excerpt": paragraphs[0][:200] if paragraphs else "Converted by the stub server.",
+            "post_category": "Tokyo",
+            "tags_input": "stub, test",
+        })
+    if not paragraphs:
+        return HTML_REPLY
+    body_html = "\n".join(f"  <p>{p}</p>" for p in paragraphs)
+    return (f"<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n  <title>{title}</title>\n</head>\n<body>\n"
+            f"  <h1>{title}</h1>\n{body_html}\n</body>\n</html>")
+
+
+def make_completion(body):
+    prompt = _prompt_text(body)
+    reply = _reply(body)
+    finish_reason = "stop"
+    max_tokens = body.get("max_tokens")
+    if max_tokens and len(reply) // 4 > max_tokens:
+        # Cut off like the real service, so long answers exercise the retry in smaller sections
+        reply = reply[:max_tokens * 4]
+        finish_reason = "length"
+    prompt_tokens = len(prompt) // 4
+    completion_tokens = len(reply) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": finish_reason,
+            "message": {"role": "assistant", "content": reply},
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _new_id(prefix):
+    return f"{prefix}-{uuid.uuid4().hex}"
+
+
+class Quota:
+    """Requests and tokens used over the last minute, counted like Azure's RPM/TPM quota.
+
+    A request counts its prompt plus max_tokens. check() returns None if the
+    request fits, or the seconds until it would.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.lock = threading.Lock()
+        self.used = deque()
+        self.tokens = 0
+
+    def check(self, tokens):
+        if not self.requests_per_minute and not self.tokens_per_minute:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            while self.used and self.used[0][0] <= now - 60:
+                self.tokens -= self.used.popleft()[1]
+            over_requests = self.requests_per_minute and len(self.used) >= self.requests_per_minute
+            over_tokens = self.tokens_per_minute and self.tokens + tokens > self.tokens_per_minute
+            if over_requests or over_tokens:
+                return max(0.1, self.used[0][0] + 60 - now) if self.used else 1.0
+            self.used.append((now, tokens))
+            self.tokens += tokens
+        return None
+
+
+def draw_latency(options, completion_tokens):
+    """Seconds to wait before answering, from the configured distribution plus generation time."""
+    if options.latency_distribution == "fixed":
+        latency = options.min_latency
+    elif options.latency_distribution == "lognormal":
+        median = math.sqrt(max(options.min_latency, 1e-3) * max(options.max_latency, 1e-3))
+        latency = random.lognormvariate(math.log(median), options.latency_sigma)
+        latency = min(max(latency, options.min_latency), options.max_latency)
+    else:
+        latency = random.uniform(options.min_latency, options.max_latency)
+    if options.tokens_per_second:
+        latency += completion_tokens / options.tokens_per_second
+    return latency
+
+
+class BatchStore:
+    """Uploaded files and batches, kept in memory for the lifetime of the server."""
+
+    def __init__(self, options):
+        self.options = options
+        self.lock = threading.RLock()
+        self.files = {}
+        self.batches = {}
+
+    def add_file(self, filename, purpose, content):
+        file_id = _new_id("file")
+        with self.lock:
+            self.files[file_id] = {
+                "meta": {
+                    "id": file_id,
+                    "object": "file",
+                    "bytes": len(content),
+                    "created_at": int(time.time()),
+                    "filename": filename,
+                    "purpose": purpose,
+                    "status": "processed",
+                },
+                "content": content,
+            }
+        return self.files[file_id]["meta"]
+
+    def create_batch(self, input_file_id, endpoint, completion_window):
+        lines = [line for line in self.files[input_file_id]["content"].decode("utf-8").splitlines() if line.strip()]
+        batch_id = _new_id("batch")
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": endpoint,
+            "errors": None,
+            "input_file_id": input_file_id,
+            "completion_window": completion_window,
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": len(lines), "completed": 0, "failed": 0},
+        }
+        with self.lock:
+            self.batches[batch_id] = {"batch": batch, "started": time.monotonic()}
+        return batch
+
+    def _finish(self, batch):
+        requests = [json.loads(line) for line in
+                    self.files[batch["input_file_id"]]["content"].decode("utf-8").splitlines() if line.strip()]
+        output, errors = [], []
+        for request in requests:
+            if random.random() < self.options.batch_failure_probability:
+                errors.append({
+                    "id": _new_id("batch_req"),
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 500, "body": {"error": {"code": "server_error", "message": "Stub failure"}}},
+                    "error": None,
+                })
+            else:
+                output.append({
+                    "id": _new_id("batch_req"),
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": make_completion(request["body"])},
+                    "error": None,
+                })
+        if output:
+            content = "".join(json.dumps(record) + "\n" for record in output).encode("utf-8")
+            batch["output_file_id"] = self.add_file("output.jsonl", "batch_output", content)["id"]
+        if errors:
+            content = "".join(json.dumps(record) + "\n" for record in errors).encode("utf-8")
+            batch["error_file_id"] = self.add_file("errors.jsonl", "batch_output", content)["id"]
+        batch["request_counts"] = {"total": len(requests), "completed": len(output), "failed": len(errors)}
+        batch["status"] = "completed"
+        batch["completed_at"] = int(time.time())
+
+    def get_batch(self, batch_id):
+        with self.lock:
+            entry = self.batches[batch_id]
+            batch = entry["batch"]
+            if batch["status"] in ("completed", "cancelled"):
+                return batch
+            progress = (time.monotonic() - entry["started"]) / max(self.options.batch_duration, 1e-6)
+            if progress >= 1:
+                self._finish(batch)
+            elif progress >= 0.8:
+                batch["status"] = "finalizing"
+            elif progress >= 0.1:
+                batch["status"] = "in_progress"
+                total = batch["request_counts"]["total"]
+                batch["request_counts"]["completed"] = int(total * progress)
+            return batch
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    options = None
+    store = None
+    quota = None
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self):
+        self._send_json(404, {"error": {"code": "404", "message": "Resource not found"}})
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def _upload_file(self, raw):
+        # The SDK uploads files as multipart/form-data with "purpose" and "file" fields
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + raw
+        )
+        fields = {}
+        for part in message.iter_parts():
+            fields[part.get_param("name", header="content-disposition")] = part
+        meta = self.store.add_file(
+            fields["file"].get_filename() or "upload.jsonl",
+            fields["purpose"].get_content().strip(),
+            fields["file"].get_payload(decode=True),
+        )
+        self._send_json(200, meta)
+
+    def _send_event(self, payload):
+        self.wfile.write(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+        self.wfile.flush()
+
+    def _send_stream(self, completion, latency, include_usage):
+        # No Content-Length: the events run until the connection closes
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        reply = completion["choices"][0]["message"]["content"]
+        pieces = [reply[i:i + 40] for i in range(0, len(reply), 40)] or [""]
+        chunk = {key: completion[key] for key in ("id", "created", "model")}
+        chunk["object"] = "chat.completion.chunk"
+        time.sleep(latency * 0.2)
+        for n, piece in enumerate(pieces):
+            delta = {"content": piece} if n else {"role": "assistant", "content": piece}
+            self._send_event(dict(chunk, choices=[{"index": 0, "delta": delta, "finish_reason": None}]))
+            time.sleep(latency * 0.8 / len(pieces))
+        finish_reason = completion["choices"][0]["finish_reason"]
+        self._send_event(dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": finish_reason}]))
+        if include_usage:
+            self._send_event(dict(chunk, choices=[], usage=completion["usage"]))
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].rstrip("/").split("/")
+        if len(parts) >= 2 and parts[-2] == "batches" and parts[-1] in self.store.batches:
+            self._send_json(200, self.store.get_batch(parts[-1]))
+        elif len(parts) >= 3 and parts[-1] == "content" and parts[-3] == "files" and parts[-2] in self.store.files:
+            data = self.store.files[parts[-2]]["content"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif len(parts) >= 2 and parts[-2] == "files" and parts[-1] in self.store.files:
+            self._send_json(200, self.store.files[parts[-1]]["meta"])
+        else:
+            self._not_found()
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        raw = self._read_body()
+        if path.endswith("/files"):
+            self._upload_file(raw)
+            return
+        body = json.loads(raw or b"{}")
+        if path.endswith("/batches"):
+            if body.get("input_file_id") not in self.store.files:
+                self._not_found()
+                return
+            self._send_json(200, self.store.create_batch(
+                body["input_file_id"], body.get("endpoint"), body.get("completion_window", "24h")))
+            return
+        if not path.endswith("/chat/completions"):
+            self._not_found()
+            return
+
+        completion = make_completion(body)
+        tokens = completion["usage"]["prompt_tokens"] + (body.get("max_tokens") or 0)
+        retry_after = self.quota.check(tokens)
+        if retry_after is None and random.random() < self.options.rate_limit_probability:
+            retry_after = self.options.retry_after
+        if retry_after is not None:
+            self._send_json(
+                429,
+                {"error": {"code": "429", "message": f"Rate limit exceeded. Retry after {retry_after:.0f} seconds."}},
+                {"Retry-After": str(math.ceil(retry_after)), "retry-after-ms": str(int(retry_after * 1000))},
+            )
+            return
+        if random.random() < self.options.error_probability:
+            self._send_json(500, {"error": {"code": "InternalServerError", "message": "Stub server error"}})
+            return
+
+        latency = draw_latency(self.options, completion["usage"]["completion_tokens"])
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            self._send_stream(completion, latency, include_usage)
+            return
+        time.sleep(latency)
+        self._send_json(200, completion)
+
+    def log_message(self, format, *args):
+        if not self.options.quiet:
+            super().log_message(format, *args)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Stub Azure OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency-distribution", choices=("uniform", "lognormal", "fixed"), default="uniform",
+                        help="uniform between min and max, lognormal with median sqrt(min*max) "
+                             "clipped to [min, max], or always min")
+    parser.add_argument("--min-latency", type=float, default=0.2, help="seconds")
+    parser.add_argument("--max-latency", type=float, default=2.0, help="seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="spread of the lognormal latency")
+    parser.add_argument("--tokens-per-second", type=float, default=0,
+                        help="generation speed added to the latency (0 = off)")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before answering 429 (0 = no limit)")
+    parser.add_argument("--tpm", type=int, default=0,
+                        help="tokens (prompt + max_tokens) per minute before answering 429 (0 = no limit)")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.1,
+                        help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0,
+                        help="Retry-After value sent with 429 answers, in seconds")
+    parser.add_argument("--error-probability", type=float, default=0.0,
+                        help="share of requests answered with 500")
+    parser.add_argument("--batch-duration", type=float, default=10.0,
+                        help="seconds until a submitted batch completes")
+    parser.add_argument("--batch-failure-probability", type=float, default=0.0,
+                        help="share of batch requests written to the error file")
+    parser.add_argument("--seed", type=int, help="seed for latencies and injected errors")
+    parser.add_argument("--quiet", action="store_true")
+    return parser
+
+
+def make_server(options):
+    """A server for the parsed `options`; port 0 picks a free port (see server.server_port)."""
+    if options.seed is not None:
+        random.seed(options.seed)
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "options": options,
+        "store": BatchStore(options),
+        "quota": Quota(options.rpm, options.tpm),
+    })
+    server = ThreadingHTTPServer((options.host, options.port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    options = build_parser().parse_args()
+    server = make_server(options)
+    print(f"Stub Azure OpenAI server listening on http://{options.host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Checking model answers locally and fixing what can be fixed without another request.
+
+These helpers are shared by the profiles: lenient JSON parsing (code fences,
+answers cut off mid-way), an incremental HTML well-formedness check, and
+removal of links and emojis.
+"""
+import json
+import re
+from html.parser import HTMLParser
+
+# Elements that never have a closing tag
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+    "param", "source", "track", "wbr",
+}
+# Elements whose closing tag HTML allows to leave out
+OPTIONAL_END_TAGS = {
+    "caption", "colgroup", "dd", "dt", "li", "optgroup", "option", "p", "rp", "rt",
+    "tbody", "td", "tfoot", "th", "thead", "tr",
+}
+
+_FENCE = re.compile(r"^\s*```[\w-]*\s*\n?(.*?)\n?\s*```\s*$", re.DOTALL)
+_STRING_FIELD = re.compile(r'"(\w+)"\s*:\s*"((?:[^"\\]|\\.)*)"', re.DOTALL)
+_LINK = re.compile(r"<a\b[^>]*>(.*?)</a>", re.IGNORECASE | re.DOTALL)
+_URL = re.compile(r"\s*\(?\b(?:https?://|www\.)[^\s<>()\"]+\)?", re.IGNORECASE)
+_EMOJI = re.compile(
+    "["
+    "\U0001F1E6-\U0001F1FF"  # flags
+    "\U0001F300-\U0001FAFF"  # pictographs, emoticons, transport, symbols
+    "☀-➿"          # miscellaneous symbols and dingbats
+    "⬀-⯿"          # arrows and stars
+    "️‍"           # variation selector and zero-width joiner
+    "]+"
+)
+
+
+def strip_code_fences(text):
+    """Remove a ```json / ```html fence the model sometimes wraps its answer in."""
+    match = _FENCE.match(text or "")
+    return match.group(1) if match else (text or "")
+
+
+def _close_json(text):
+    """Complete a JSON object that was cut off: close the open arrays and objects.
+
+    A string cut off mid-way is dropped with its key, rather than closed, so
+    the field is missing instead of looking complete. So is an array that was
+    still being written.
+    """
+    stack = []
+    in_string = False
+    escaped = False
+    string_start = None
+    for position, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            string_start = position
+        elif char in "{[":
+            stack.append(("}" if char == "{" else "]", position))
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        cut = string_start
+        # Inside an array, the whole array goes: a shortened list would pass for complete
+        for depth, (closer, start) in enumerate(stack):
+            if closer == "]" and all(c == "]" for c, _ in stack[depth:]):
+                cut = start
+                stack = stack[:depth]
+                break
+        text = text[:cut]
+    text = re.sub(r",\s*$", "", text)
+    # A key without its value can't be completed; drop it
+    text = re.sub(r',?\s*"[^"]*"\s*:\s*$', "", text)
+    return text + "".join(closer for closer, _ in reversed(stack))
+
+
+def parse_json_lenient(text):
+    """Parse a JSON object out of a model answer, tolerating fences, chatter and truncation.
+
+    Returns the parsed dict. An answer cut off mid-way keeps only the fields
+    it completed; if the object can't be completed, the string fields that
+    are complete are returned. Raises json.JSONDecodeError if nothing at all
+    can be recovered.
+    """
+    text = strip_code_fences(text).strip()
+    start = text.find("{")
+    if start == -1:
+        raise json.JSONDecodeError("No JSON object found", text, 0)
+    candidate = text[start:]
+    try:
+        value, _ = json.JSONDecoder().raw_decode(candidate)
+        if isinstance(value, dict):
+            return value
+    except json.JSONDecodeError:
+        pass
+    try:
+        value = json.loads(_close_json(candidate))
+        if isinstance(value, dict):
+            return value
+    except json.JSONDecodeError:
+        pass
+    fields = {key: json.loads(f'"{value}"') for key, value in _STRING_FIELD.findall(candidate)}
+    if not fields:
+        raise json.JSONDecodeError("Could not recover any field from the answer", text, start)
+    return fields
+
+
+class HtmlChecker(HTMLParser):
+    """Incremental well-formedness check: feed() HTML as it arrives, close() for the problems.
+
+    Reports closing tags that don't match, and elements still open at the end
+    (which is what a cut-off answer looks like).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.open_tags = []
+        self.problems = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in VOID_ELEMENTS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        pass
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        if self.open_tags and self.open_tags[-1] == tag:
+            self.open_tags.pop()
+        elif tag in self.open_tags:
+            while self.open_tags[-1] != tag:
+                unclosed = self.open_tags.pop()
+                if unclosed not in OPTIONAL_END_TAGS:
+                    self.problems.append(f"<{unclosed}> is not closed before </{tag}>")
+            self.open_tags.pop()
+        else:
+            self.problems.append(f"unexpected </{tag}>")
+
+    def close(self):
+        super().close()
+        unclosed = [tag for tag in reversed(self.open_tags) if tag not in OPTIONAL_END_TAGS]
+        return self.problems + [f"<{tag}> is never closed" for tag in unclosed]
+
+
+def check_html(html):
+    checker = HtmlChecker()
+    checker.feed(html)
+    return checker.close()
+
+
+def close_open_tags(html):
+    """Append the closing tags of elements left open at the end, e.g. after truncation."""
+    checker = HtmlChecker()
+    checker.feed(html)
+    checker.close()
+    if not checker.open_tags:
+        return html
+    return html.rstrip() + "".join(f"</{tag}>" for tag in reversed(checker.open_tags))
+
+
+def remove_links(html):
+    """Replace <a> elements by their text and drop bare URLs."""
+    return _URL.sub("", _LINK.sub(r"\1", html))
+
+
+def has_links(text):
+    return bool(_LINK.search(text) or _URL.search(text))
+
+
+def remove_emojis(text):
+    return re.sub(r"[ \t]{2,}", " ", _EMOJI.sub("", text))
+
+
+def has_emojis(text):
+    return bool(_EMOJI.search(text))